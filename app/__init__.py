@@ -3,18 +3,38 @@ import os
 from datetime import datetime
 from uuid import uuid4
 
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from .config import Config
-from .extensions import db
+from .extensions import db, apply_sqlite_pragmas
+from .json_provider import OrjsonProvider
+from .metrics import init_metrics
+from .services.cache_service import CacheService
+from .commands import (
+    create_tables,
+    upgrade_schema,
+    upgrade_schema_command,
+    create_indexes_command,
+    rebuild_search_index_command,
+    recalculate_order_totals_command,
+    migrate_photos_command,
+    sweep_photos_command,
+)
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if app.config['FAST_SERIALIZATION'] and OrjsonProvider.available():
+        app.json = OrjsonProvider(app)
 
     # Инициализация расширений
     db.init_app(app)
+    CacheService.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+        init_metrics(app, db.engine)
 
     CORS(app)
 
@@ -23,13 +43,16 @@ def create_app(config_class=Config):
     from app.client import models as client_models
     from app.product import models as product_models
     from app.order import models as order_models
+    from app.services.search_service import SearchService
 
     with app.app_context():
-        db.create_all()
+        create_tables()
 
     app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'product_photos')
     app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
     app.config['MAX_FILE_SIZE'] = 16 * 1024 * 1024  # 16MB
+    # Уменьшенные варианты фото: имя -> максимальная сторона в пикселях
+    app.config['PHOTO_VARIANTS'] = {'thumb': 256, 'medium': 1024}
 
     # Создаем папку для загрузок, если ее нет
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -39,14 +62,32 @@ def create_app(config_class=Config):
     from app.product.route import product_bp
     from app.client.route import client_bp
     from app.order.route import order_bp
+    from app.batch.route import batch_bp
+    from app.sync.route import sync_bp
 
     app.register_blueprint(user_bp, url_prefix='/api/user')
     app.register_blueprint(product_bp, url_prefix='/api/product')
     app.register_blueprint(client_bp, url_prefix='/api/client')
     app.register_blueprint(order_bp, url_prefix='/api/order')
+    app.register_blueprint(batch_bp, url_prefix='/api/batch')
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def request_entity_too_large(error):
+        return jsonify({'error': 'Request body too large'}), 413
 
-    # Создание таблиц при первом запуске
+    # Создание таблиц при первом запуске, недостающих колонок и индексов в старых БД
     with app.app_context():
-        db.create_all()
+        create_tables()
+        if app.config['SCHEMA_AUTO_UPGRADE']:
+            upgrade_schema()
+        SearchService.ensure_tables()
+
+    app.cli.add_command(upgrade_schema_command)
+    app.cli.add_command(create_indexes_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(recalculate_order_totals_command)
+    app.cli.add_command(migrate_photos_command)
+    app.cli.add_command(sweep_photos_command)
 
     return app
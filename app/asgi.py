@@ -0,0 +1,242 @@
+import asyncio
+import inspect
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+from app.async_db import init_async_db
+
+# Корутинные обработчики: endpoint Flask -> функция с той же сигнатурой, что у синхронной
+ASYNC_VIEWS = {}
+# Пределы тела запроса меньше MAX_CONTENT_LENGTH: endpoint -> функция без аргументов (вызывается в контексте приложения)
+BODY_LIMITS = {}
+
+# Тело запроса больше этого размера читается во временный файл, а не в память
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def async_view(endpoint):
+    """Регистрация корутинного варианта для маршрута endpoint (используется только в AsgiApp)"""
+    def decorator(f):
+        ASYNC_VIEWS[endpoint] = f
+        return f
+    return decorator
+
+
+def body_limit(*endpoints):
+    """Регистрация предела тела запроса для маршрутов: AsgiApp отвечает 413, не дочитывая тело"""
+    def decorator(f):
+        for endpoint in endpoints:
+            BODY_LIMITS[endpoint] = f
+        return f
+    return decorator
+
+
+def _environ(scope):
+    """WSGI environ из HTTP scope ASGI (без тела запроса)"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for name, value in scope['headers']:
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]) if isinstance(status, str) else status,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    }
+
+
+class AsgiApp:
+    """ASGI-обёртка Flask-приложения.
+
+    Маршруты с корутинным вариантом (ASYNC_VIEWS) выполняются прямо в цикле событий
+    на AsyncSession - ожидание БД не занимает поток. Остальные запросы идут в обычный
+    WSGI-обработчик Flask в пуле из ASGI_THREADS потоков.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.engine = init_async_db(app)
+        self.executor = ThreadPoolExecutor(app.config['ASGI_THREADS'], thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _body_limit(self, environ):
+        """Предел тела для маршрута запроса: BODY_LIMITS или MAX_CONTENT_LENGTH"""
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint = None
+        with self.app.app_context():
+            limit_for = BODY_LIMITS.get(endpoint)
+            return limit_for() if limit_for else self.app.config['MAX_CONTENT_LENGTH']
+
+    async def _read_body(self, receive, limit):
+        """(файл с телом запроса, размер); файл None, как только тело превысило limit"""
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if limit is not None and size > limit:
+                body.close()
+                return None, size
+            body.write(chunk)
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body, size
+
+    async def _too_large(self, environ, send):
+        with self.app.app_context():
+            response = self.app.json.response({'error': 'Request body too large'})
+        response.status_code = 413
+        await self._send_response(response, environ, send)
+
+    async def _http(self, scope, receive, send):
+        environ = _environ(scope)
+        limit = self._body_limit(environ)
+        # Заявленный размер проверяется до чтения, фактический - по мере чтения (chunked)
+        declared = environ.get('CONTENT_LENGTH', '')
+        if limit is not None and declared.isdigit() and int(declared) > limit:
+            await self._too_large(environ, send)
+            return
+        body, size = await self._read_body(receive, limit)
+        if body is None:
+            await self._too_large(environ, send)
+            return
+
+        # Тело уже прочитано целиком: Flask не должен ждать его по заголовку (или без него при chunked)
+        environ['CONTENT_LENGTH'] = str(size)
+        environ['wsgi.input'] = body
+        environ['wsgi.input_terminated'] = True
+        try:
+            await self._handle(environ, send)
+        finally:
+            body.close()
+
+    async def _handle(self, environ, send):
+        ctx = self.app.request_context(environ)
+        ctx.push()
+        view = ASYNC_VIEWS.get(request.endpoint)
+        if view is None:
+            ctx.pop()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self._run_wsgi, environ, send, loop)
+            return
+
+        error = None
+        try:
+            response = await self._dispatch(view)
+            await self._send_response(response, environ, send)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            ctx.pop(error)
+
+    async def _dispatch(self, view):
+        """Аналог Flask.full_dispatch_request для корутинного обработчика"""
+        app = self.app
+        try:
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = view(**request.view_args)
+                    # token_required может вернуть готовый ответ с ошибкой, не вызывая корутину
+                    if inspect.isawaitable(rv):
+                        rv = await rv
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.finalize_request(rv)
+        except Exception as e:
+            return app.handle_exception(e)
+
+    @staticmethod
+    async def _send_response(response, environ, send):
+        app_iter, status, headers = response.get_wsgi_response(environ)
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        await send(_start_message(status, headers))
+        await send({'type': 'http.response.body', 'body': body})
+
+    def _run_wsgi(self, environ, send, loop):
+        """WSGI-вызов в потоке пула; части ответа отправляются по мере готовности (потоковый экспорт, фото)"""
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        app_iter = self.app(environ, start_response)
+        try:
+            sent_start = False
+            for chunk in app_iter:
+                if not chunk:
+                    continue
+                if not sent_start:
+                    send_sync(_start_message(*started))
+                    sent_start = True
+                send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not sent_start:
+                send_sync(_start_message(*started))
+            send_sync({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
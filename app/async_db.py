@@ -0,0 +1,45 @@
+from flask import current_app
+from sqlalchemy.engine import make_url
+
+from app.extensions import apply_sqlite_pragmas
+from app.metrics import instrument_engine
+
+try:
+    import aiosqlite
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:  # aiosqlite не установлен - доступны только синхронные обработчики (run.py)
+    aiosqlite = None
+
+# Асинхронные драйверы для синхронных URL из SQLALCHEMY_DATABASE_URI
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite'}
+
+
+def async_database_url(uri):
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f'No async driver configured for {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def init_async_db(app):
+    """AsyncEngine на ту же БД, что и db.engine, с теми же настройками пула и PRAGMA.
+
+    Фабрика сессий хранится в app.extensions['async_db'].
+    """
+    if aiosqlite is None:
+        raise RuntimeError('Async database access requires the aiosqlite package')
+
+    engine = create_async_engine(
+        async_database_url(app.config['SQLALCHEMY_DATABASE_URI']),
+        **app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    )
+    apply_sqlite_pragmas(engine.sync_engine, app.config['SQLITE_PRAGMAS'])
+    instrument_engine(app, engine.sync_engine)
+    # После коммита ответ сериализуется из тех же объектов - без повторной загрузки
+    app.extensions['async_db'] = async_sessionmaker(engine, expire_on_commit=False)
+    return engine
+
+
+def async_session():
+    return current_app.extensions['async_db']()
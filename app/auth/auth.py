@@ -1,9 +1,12 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
 import datetime
-from flask import request, jsonify
-
-# Секретный ключ для подписи токенов (замени на свой)
-SECRET_KEY = "your_secret_key_here"
+from flask import request, jsonify, current_app, g
 
 # Функция создания JWT
 def generate_jwt(user_id):
@@ -12,22 +15,100 @@ def generate_jwt(user_id):
         "iat": datetime.datetime.utcnow(),  # Время создания
         "exp": datetime.datetime.utcnow() + datetime.timedelta(weeks=1)  # Срок действия (1 неделя)
     }
-    token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+    token = jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm="HS256")
     return token
 
 # Функция декодирования JWT
 def decode_jwt(token):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
         return payload
     except jwt.ExpiredSignatureError:
         return {"error": "Token expired"}
     except jwt.InvalidTokenError:
         return {"error": "Invalid token"}
 
+
+class VerifiedTokenCache:
+    """LRU-кэш уже проверенных токенов: дайджест токена -> (user_id, момент истечения)"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user_id, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user_id
+
+    def put(self, key, user_id, expires_at, max_size):
+        if max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+token_cache = VerifiedTokenCache()
+
+
+def verify_token(token):
+    """Проверка токена с кэшем: возвращает (user_id, None) или (None, ошибка)"""
+    secret = current_app.config['JWT_SECRET_KEY']
+    # Дайджест зависит и от ключа подписи: смена ключа делает старые записи недостижимыми
+    key = hmac.new(secret.encode(), token.encode(), hashlib.sha256).digest()
+    now = time.time()
+
+    user_id = token_cache.get(key, now)
+    if user_id is not None:
+        return user_id, None
+
+    payload = decode_jwt(token)
+    if "error" in payload:
+        return None, payload
+
+    try:
+        user_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None, {"error": "Invalid token"}
+
+    # Запись живёт не дольше exp токена и не дольше JWT_CACHE_TTL
+    expires_at = now + current_app.config['JWT_CACHE_TTL']
+    if "exp" in payload:
+        expires_at = min(expires_at, payload["exp"])
+    token_cache.put(key, user_id, expires_at, current_app.config['JWT_CACHE_SIZE'])
+    return user_id, None
+
 # Декоратор для защиты маршрутов
 def token_required(f):
     def wrapper(*args, **kwargs):
+        # Подзапрос /api/batch: токен уже проверен при входе в пакет
+        batch_user_id = g.get('batch_user_id')
+        if batch_user_id is not None:
+            return f(batch_user_id, *args, **kwargs)
+
         auth_header = request.headers.get("Authorization")
         if not auth_header:
             return jsonify({"error": "Token required"}), 401
@@ -36,13 +117,11 @@ def token_required(f):
         if len(parts) != 2 or parts[0] != "Bearer":
             return jsonify({"error": "Invalid token format"}), 401
 
-        token = parts[1]
-        payload = decode_jwt(token)
-
-        if "error" in payload:
-            return jsonify(payload), 401  # Возвращаем ошибку токена
+        user_id, error = verify_token(parts[1])
+        if error:
+            return jsonify(error), 401  # Возвращаем ошибку токена
 
-        return f(payload["sub"], *args, **kwargs)  # Передаём user_id в защищённый маршрут
+        return f(user_id, *args, **kwargs)  # Передаём user_id (int) в защищённый маршрут
 
     wrapper.__name__ = f.__name__
     return wrapper
@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from marshmallow import ValidationError
+
+from app.auth.auth import token_required
+from app.batch.schemas import batch_schema
+from app.services.batch_service import BatchService
+
+batch_bp = Blueprint('batch', __name__, url_prefix='/batch')
+
+
+@batch_bp.route('', methods=['POST'])
+@token_required
+def execute_batch(user_id):
+    data = request.json
+    if data is None:
+        return jsonify({"error": "No data"}), 400
+
+    try:
+        validated_data = batch_schema.load(data)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    result, errors = BatchService.execute(user_id, validated_data['requests'], validated_data['atomic'])
+    if errors:
+        return jsonify(errors), 400
+
+    # Откат атомарного пакета - ошибка всего запроса
+    status = 409 if result['atomic'] and not result['committed'] else 200
+    return jsonify(result), status
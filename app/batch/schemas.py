@@ -0,0 +1,18 @@
+from marshmallow import validate, fields
+
+from app.extensions import ma
+
+
+class SubRequestSchema(ma.Schema):
+    method = fields.String(required=True, validate=validate.OneOf(['GET', 'POST', 'PUT', 'PATCH', 'DELETE']))
+    path = fields.String(required=True, validate=validate.Regexp(r'^/api/'))
+    body = fields.Raw(load_default=None)
+
+
+class BatchSchema(ma.Schema):
+    atomic = fields.Boolean(load_default=False)
+    requests = fields.List(fields.Nested(SubRequestSchema), required=True, validate=validate.Length(min=1))
+
+
+# Схемы не хранят состояние между вызовами - один экземпляр на процесс
+batch_schema = BatchSchema()
@@ -0,0 +1,82 @@
+import hashlib
+import inspect
+
+from flask import request, make_response
+
+from app.async_db import async_session
+
+from app.services.change_service import ChangeService
+
+PHOTO_MAX_AGE = 365 * 24 * 60 * 60  # имена файлов уникальны, содержимое по имени не меняется
+
+
+def list_etag(user_id, resource):
+    """ETag списка: версия счётчика изменений + параметры страницы.
+
+    Версия всегда читается из БД (один запрос по индексу), а не из кэша процесса:
+    иначе после записи в другом воркере этот отвечал бы 304 на изменившийся список.
+    """
+    return _etag(user_id, resource, ChangeService.get_version(user_id, resource))
+
+
+async def list_etag_async(user_id, resource):
+    """list_etag с чтением версии через AsyncSession"""
+    async with async_session() as session:
+        version = await ChangeService.get_version_async(session, user_id, resource)
+    return _etag(user_id, resource, version)
+
+
+def _etag(user_id, resource, version):
+    query_hash = hashlib.sha1(request.query_string).hexdigest()[:12]
+    return f"{resource}-{user_id}-{version}-{query_hash}"
+
+
+def _conditional_response(etag, make_body):
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        response = make_response(make_body())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional_list(resource):
+    """Условный GET для списков: при совпадении If-None-Match отдаём 304 без запроса данных и сериализации.
+
+    Ставится под token_required. Версия читается до выборки данных, поэтому запись,
+    пришедшая между ними, даст клиенту устаревший ETag и свежие данные, а не наоборот.
+    Для корутинных представлений (ASGI) версия читается через AsyncSession.
+    """
+    def decorator(f):
+        if inspect.iscoroutinefunction(f):
+            async def wrapper(user_id, *args, **kwargs):
+                etag = await list_etag_async(user_id, resource)
+                body = None if etag in request.if_none_match else await f(user_id, *args, **kwargs)
+                return _conditional_response(etag, lambda: body)
+        else:
+            def wrapper(user_id, *args, **kwargs):
+                etag = list_etag(user_id, resource)
+                return _conditional_response(etag, lambda: f(user_id, *args, **kwargs))
+
+        wrapper.__name__ = f.__name__
+        return wrapper
+    return decorator
+
+
+def cache_revalidate(response):
+    """Ответ можно хранить, но перед использованием нужно перепроверить (ETag/Last-Modified)"""
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def cache_immutable(response):
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = PHOTO_MAX_AGE
+    response.cache_control.immutable = True
+    return response
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from app.extensions import db
 
 class Client(db.Model):
@@ -6,4 +8,12 @@ class Client(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=True)
-    phone = db.Column(db.String(20), nullable=True)
\ No newline at end of file
+    phone = db.Column(db.String(20), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_clients_user_id_id', 'user_id', 'id'),
+        db.Index('ix_clients_user_id_updated_at', 'user_id', 'updated_at'),
+        # AUTOINCREMENT: id удалённой строки не выдаётся повторно (tombstone /api/sync однозначен)
+        {'sqlite_autoincrement': True},
+    )
@@ -1,8 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from marshmallow import ValidationError
 from app.auth.auth import token_required, decode_jwt
 from app.client.models import Client
-from app.client.schemas import ClientSchema
+from app.client.schemas import client_schema, client_update_schema
+from app.caching import conditional_list
+from app.pagination import get_page_args
+from app.services.change_service import ChangeService
 from app.services.client_service import ClientService
+from app.services.export_service import ExportService
+from app.services.import_service import ImportService
 
 client_bp = Blueprint('client', __name__, url_prefix='/client')
 
@@ -11,12 +17,9 @@ client_bp = Blueprint('client', __name__, url_prefix='/client')
 @token_required
 def create_client(user_id):
     try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid user id'}), 400
-
-    data = request.get_json()
-    data['user_id'] = user_id
+        data = client_schema.load({**(request.get_json() or {}), 'user_id': user_id})
+    except ValidationError as err:
+        return jsonify(err.messages), 400
 
     client, errors = ClientService.create_client(user_id, data)
     if errors:
@@ -27,26 +30,74 @@ def create_client(user_id):
 
 @client_bp.route('/', methods=['GET'])
 @token_required
+@conditional_list(ChangeService.CLIENT)
 def get_clients(user_id):
     try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid user id'}), 400
+        limit, after = get_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    clients, errors = ClientService.get_all_clients(user_id)
+    clients, errors = ClientService.get_all_clients(user_id, limit, after)
     if errors:
         return jsonify(errors), 400
     return jsonify(clients), 200
 
 
-@client_bp.route('/<int:client_id>', methods=['GET'])
+@client_bp.route('/import', methods=['POST'])
 @token_required
-def get_client(user_id, client_id):
+def import_clients(user_id):
+    try:
+        rows = ImportService.read_rows(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        report, errors = ImportService.import_clients(user_id, rows)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if errors:
+        return jsonify(errors), 400
+
+    # Ни одна строка не прошла валидацию - это ошибка запроса целиком
+    status = 400 if report['errors'] and not report['imported'] else 201
+    return jsonify(report), status
+
+
+@client_bp.route('/export', methods=['GET'])
+@token_required
+def export_clients(user_id):
+    export_format = request.args.get('format', 'ndjson')
+    result, errors = ExportService.export('client', user_id, export_format)
+    if errors:
+        return jsonify(errors), 400
+
+    chunks, mimetype = result
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=clients.{export_format}'
+    return response
+
+
+@client_bp.route('/search', methods=['GET'])
+@token_required
+def search_clients(user_id):
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+
     try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid user id'}), 400
+        limit, after = get_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    clients, errors = ClientService.search_clients(user_id, query, limit, after)
+    if errors:
+        return jsonify(errors), 400
+    return jsonify(clients), 200
+
+
+@client_bp.route('/<int:client_id>', methods=['GET'])
+@token_required
+def get_client(user_id, client_id):
     client, errors = ClientService.get_client(client_id)
 
     if errors:
@@ -60,22 +111,15 @@ def get_client(user_id, client_id):
 @client_bp.route('/<int:client_id>', methods=['PUT'])
 @token_required
 def update_client(user_id, client_id):
-    try:
-        user_id = int(user_id)
-        client_id = int(client_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid user id'}), 400
-
     client = Client.query.get(client_id)
 
     if not client or client.user_id != user_id:
         return jsonify({'error': 'Access denied'}), 403
 
-    data = request.json
-    schema = ClientSchema(partial=True)
-    errors = schema.validate(data)
-    if errors:
-        return jsonify(errors), 400
+    try:
+        data = client_update_schema.load(request.json)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
 
     updated_client, errors = ClientService.update_client(client, data)
 
@@ -87,11 +131,6 @@ def update_client(user_id, client_id):
 @client_bp.route('/<int:client_id>', methods=['DELETE'])
 @token_required
 def delete_client(user_id, client_id):
-    try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid user id'}), 400
-
     client = Client.query.get(client_id)
 
     if not client or client.user_id != user_id:
@@ -12,4 +12,10 @@ class ClientSchema(ma.SQLAlchemySchema):
     first_name = ma.auto_field(validate=validate.Length(min=3, max=50), required=True)
     last_name = ma.auto_field(validate=validate.Length(min=3, max=50),required=False)
     phone = ma.auto_field(validate=validate.Length(min=2, max=20), required=False)
-    user_id = ma.auto_field()
\ No newline at end of file
+    user_id = ma.auto_field()
+
+
+# Схемы не хранят состояние между вызовами - один экземпляр на процесс
+client_schema = ClientSchema()
+client_update_schema = ClientSchema(partial=True)
+clients_schema = ClientSchema(many=True)
@@ -0,0 +1,149 @@
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from app.extensions import db
+from app.services.order_service import OrderService
+from app.services.photo_service import PhotoService
+from app.services.search_service import SearchService
+
+def create_tables():
+    """db.create_all(), устойчивый к параллельному старту нескольких воркеров на новой БД.
+
+    create_all проверяет наличие таблиц до CREATE; таблицу или индекс, созданные между
+    проверкой и CREATE другим процессом, пропускаем и повторяем для оставшихся.
+    """
+    for _ in range(len(db.metadata.sorted_tables)):
+        try:
+            db.create_all()
+            return
+        except OperationalError as e:
+            if 'already exists' not in str(e.orig):
+                raise
+    db.create_all()
+
+
+def ensure_columns():
+    """Добавление в существующие таблицы колонок, объявленных позже (ALTER TABLE ADD COLUMN).
+
+    Новые NOT NULL колонки должны иметь server_default, иначе SQLite не сможет их добавить.
+    Колонку, которую между проверкой и ALTER успел добавить другой процесс, пропускаем:
+    в added попадают только добавленные этим вызовом.
+    """
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column_ddl}'))
+            except OperationalError as e:
+                if 'duplicate column' not in str(e.orig):
+                    raise
+                continue
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def upgrade_schema():
+    """Доведение существующей БД до текущих моделей без пересоздания таблиц"""
+    added = ensure_columns()
+    if 'orders.total' in added or 'orders.item_count' in added:
+        OrderService.recalculate_totals()
+        db.session.commit()
+    # Существующие строки получают отметку времени миграции, иначе их не увидит /api/sync
+    for table in ('products', 'clients', 'orders'):
+        if f'{table}.updated_at' in added:
+            db.session.execute(text(f'UPDATE {table} SET updated_at = :now WHERE updated_at IS NULL'),
+                               {'now': datetime.utcnow()})
+            db.session.commit()
+    return added, ensure_indexes()
+
+
+def ensure_indexes():
+    """Создание недостающих индексов в уже существующей БД.
+
+    db.create_all() пропускает существующие таблицы вместе с их индексами,
+    поэтому объявленные позже индексы досоздаются здесь. IF NOT EXISTS - на случай,
+    если индекс между проверкой и созданием успел создать другой процесс.
+    """
+    inspector = inspect(db.engine)
+    created = []
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+                    created.append(index.name)
+    return created
+
+
+@click.command('upgrade-schema')
+@with_appcontext
+def upgrade_schema_command():
+    """Добавить недостающие колонки и индексы (один раз при выкладке, если SCHEMA_AUTO_UPGRADE выключен)."""
+    added, created = upgrade_schema()
+    click.echo(f"Added columns: {', '.join(added) or 'none'}")
+    click.echo(f"Created indexes: {', '.join(created) or 'none'}")
+
+
+@click.command('create-indexes')
+@with_appcontext
+def create_indexes_command():
+    """Досоздать недостающие индексы без пересоздания таблиц."""
+    created = ensure_indexes()
+    if created:
+        click.echo(f"Created indexes: {', '.join(created)}")
+    else:
+        click.echo('All indexes already exist')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Перестроить полнотекстовые индексы продуктов и клиентов."""
+    if not SearchService.enabled():
+        click.echo('Full-text search requires SQLite')
+        return
+    products, clients = SearchService.rebuild()
+    click.echo(f"Indexed {products} products and {clients} clients")
+
+
+@click.command('recalculate-order-totals')
+@with_appcontext
+def recalculate_order_totals_command():
+    """Пересчитать total и item_count всех заказов по их строкам."""
+    OrderService.recalculate_totals()
+    db.session.commit()
+    click.echo('Order totals recalculated')
+
+
+@click.command('migrate-photos')
+@with_appcontext
+def migrate_photos_command():
+    """Перенести фото из плоской папки в хранилище по хэшу содержимого."""
+    migrated = PhotoService.migrate_legacy()
+    click.echo(f"Migrated {migrated} photos")
+
+
+@click.command('sweep-photos')
+@click.option('--grace', type=int, default=None, help='Минимальный возраст файла, сек (по умолчанию PHOTO_ORPHAN_GRACE)')
+@with_appcontext
+def sweep_photos_command(grace):
+    """Удалить файлы фото, на которые не ссылается ни один продукт (запускать по расписанию)."""
+    if grace is None:
+        grace = current_app.config['PHOTO_ORPHAN_GRACE']
+    removed = PhotoService.sweep_orphans(grace)
+    click.echo(f"Removed {removed} orphaned photos")
@@ -6,13 +6,101 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
 
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///database.db'
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///database.db')
 
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
+    # Кэш проверенных токенов: число записей (0 - выключен) и максимальное время жизни записи, сек
+    JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 10000))
+    JWT_CACHE_TTL = int(os.getenv('JWT_CACHE_TTL', 300))
+
+    # Параметры KDF для паролей (формат werkzeug); при смене старые хеши пересчитываются при входе
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Отдельный пул для хеширования: число потоков и длина очереди, сверх которой отвечаем 503
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 32))
+    PASSWORD_HASH_RETRY_AFTER = 1  # сек
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Досоздание колонок и индексов при старте; при нескольких воркерах можно выключить
+    # и выполнять flask upgrade-schema один раз при выкладке
+    SCHEMA_AUTO_UPGRADE = os.getenv('SCHEMA_AUTO_UPGRADE', 'true').lower() in ('1', 'true', 'yes')
+
+    # PRAGMA, выполняемые на каждом новом SQLite-соединении (пусто - настройки по умолчанию)
+    SQLITE_PRAGMAS = {}
+
+    # Keyset-пагинация списков
+    PAGE_SIZE_DEFAULT = 100
+    PAGE_SIZE_MAX = 500
+
+    # Размер пачки строк при потоковой выгрузке
+    EXPORT_BATCH_SIZE = 500
+
+    # Массовый импорт: максимум строк в запросе и размер пачки INSERT
+    IMPORT_MAX_ROWS = 50000
+    IMPORT_BATCH_SIZE = 500
+
+    # Общий предел тела запроса (импорт, batch); запросы с фото ограничены MAX_FILE_SIZE
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 64 * 1024 * 1024))
+
+    # Отдача фото: '' - сам Flask через wsgi.file_wrapper, 'x-sendfile' (Apache, lighttpd)
+    # или 'x-accel-redirect' (nginx: internal location PHOTO_ACCEL_PREFIX с alias на папку фото)
+    PHOTO_SENDFILE = os.getenv('PHOTO_SENDFILE', '')
+    PHOTO_ACCEL_PREFIX = os.getenv('PHOTO_ACCEL_PREFIX', '/protected/product_photos/')
+    USE_X_SENDFILE = PHOTO_SENDFILE == 'x-sendfile'
+    # sweep-photos удаляет файлы без ссылок, не изменявшиеся дольше этого времени, сек
+    PHOTO_ORPHAN_GRACE = int(os.getenv('PHOTO_ORPHAN_GRACE', 3600))
+
+    # Максимум подзапросов в POST /api/batch
+    BATCH_MAX_REQUESTS = 100
+
+    # Быстрая сериализация ответов: готовые функции вместо dump схем marshmallow и orjson (если установлен)
+    FAST_SERIALIZATION = os.getenv('FAST_SERIALIZATION', 'true').lower() in ('1', 'true', 'yes')
+
+    # Кэш списков продуктов и клиентов по арендатору: '' (выключен), 'memory' или 'redis'.
+    # 'memory' - свой в каждом воркере (записи других воркеров видны по версии в БД),
+    # 'redis' - общий; требует пакета redis, который не входит в requirments.txt: pip install redis
+    CATALOG_CACHE_BACKEND = os.getenv('CATALOG_CACHE_BACKEND', '')
+    CATALOG_CACHE_SIZE = int(os.getenv('CATALOG_CACHE_SIZE', 1024))  # записей
+    CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 300))  # сек
+    CATALOG_CACHE_URL = os.getenv('CATALOG_CACHE_URL', 'redis://localhost:6379/0')
+
+    # Метрики запросов: /metrics и Server-Timing (выключены по умолчанию)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    # SQL-запросы дольше порога (мс) пишутся в лог, независимо от /metrics; 0 - не писать.
+    # По умолчанию лог включён вместе с метриками
+    SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', str(METRICS_ENABLED)).lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+
+    # Запас (сек), на который токен /api/sync сдвигается назад относительно начала синхронизации
+    SYNC_CLOCK_SKEW = 5
+
+    # Потоки для синхронных обработчиков при запуске через asgi.py
+    ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
 
 class DevelopmentConfig(Config):
     DEBUG = True
 
 class ProductionConfig(Config):
-    DEBUG = False
\ No newline at end of file
+    DEBUG = False
+
+    # WAL: читатели не блокируются писателем; busy_timeout вместо мгновенного "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),  # мс
+        'synchronous': 'NORMAL',  # в режиме WAL безопасно и без fsync на каждый коммит
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),  # отрицательное значение - в КиБ
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    }
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': 3600,
+        'pool_pre_ping': True,
+    }
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'default': Config,
+}
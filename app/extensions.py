@@ -1,5 +1,31 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
+from sqlalchemy import event
 
 ma = Marshmallow()
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Выполнение PRAGMA на каждом новом соединении пула (только для SQLite)"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def begin_transaction(session):
+    """Явный BEGIN для сессии перед SAVEPOINT.
+
+    pysqlite не начинает транзакцию перед SAVEPOINT, и RELEASE первой точки сохранения
+    сразу фиксирует изменения в SQLite. Остальные драйверы начинают транзакцию сами.
+    """
+    connection = session.connection()
+    dbapi_connection = connection.connection.dbapi_connection
+    if connection.dialect.name == 'sqlite' and not dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
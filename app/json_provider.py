@@ -0,0 +1,35 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен - остаётся стандартный провайдер Flask
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify через orjson: тело ответа собирается сразу в bytes.
+
+    Ключи сортируются, как у стандартного провайдера; даты, Decimal, UUID и dataclass
+    передаются в его default, поэтому выглядят так же.
+    """
+    OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME \
+        | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+
+    @staticmethod
+    def available():
+        return orjson is not None
+
+    def _dumps_bytes(self, obj):
+        options = self.OPTIONS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
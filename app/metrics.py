@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+
+from flask import Response, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from app.auth.auth import token_cache
+from app.services.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы времени ответа, сек
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса, живут в g"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = {}  # статус -> число запросов
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+
+
+class MetricsRegistry:
+    """Накопленные метрики по эндпоинтам (endpoint, метод) в памяти процесса"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, method, status, duration, metrics):
+        with self._lock:
+            stats = self._stats.setdefault((endpoint, method), EndpointStats())
+            stats.requests[status] = stats.requests.get(status, 0) + 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[i] += 1
+            stats.duration += duration
+            stats.sql_count += metrics.sql_count
+            stats.sql_time += metrics.sql_time
+            stats.serialize_time += metrics.serialize_time
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render(self):
+        """Текстовый формат Prometheus: строки одной метрики идут одной группой"""
+        with self._lock:
+            stats = [(f'endpoint="{endpoint}",method="{method}"', s)
+                     for (endpoint, method), s in sorted(self._stats.items())]
+
+            lines = ['# TYPE http_requests_total counter']
+            for labels, s in stats:
+                for status, count in sorted(s.requests.items()):
+                    lines.append(f'http_requests_total{{{labels},status="{status}"}} {count}')
+
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for labels, s in stats:
+                total = sum(s.requests.values())
+                for bound, count in zip(DURATION_BUCKETS, s.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {total}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {s.duration:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {total}')
+
+            for name, attr, fmt in (('db_statements_total', 'sql_count', 'd'),
+                                    ('db_statement_duration_seconds_total', 'sql_time', '.6f'),
+                                    ('serialization_duration_seconds_total', 'serialize_time', '.6f')):
+                lines.append(f'# TYPE {name} counter')
+                for labels, s in stats:
+                    lines.append(f'{name}{{{labels}}} {getattr(s, attr):{fmt}}')
+
+        cache = token_cache.stats()
+        lines += [
+            '# TYPE jwt_cache_hits_total counter',
+            f'jwt_cache_hits_total {cache["hits"]}',
+            '# TYPE jwt_cache_misses_total counter',
+            f'jwt_cache_misses_total {cache["misses"]}',
+            '# TYPE jwt_cache_size gauge',
+            f'jwt_cache_size {cache["size"]}',
+        ]
+
+        catalog = sorted(CacheService.stats().items())
+        lines.append('# TYPE catalog_cache_hits_total counter')
+        lines += [f'catalog_cache_hits_total{{resource="{name}"}} {hits}' for name, (hits, _) in catalog]
+        lines.append('# TYPE catalog_cache_misses_total counter')
+        lines += [f'catalog_cache_misses_total{{resource="{name}"}} {misses}' for name, (_, misses) in catalog]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def _current():
+    return g.get('request_metrics') if has_app_context() else None
+
+
+def record_serialization(started):
+    """Время с started (perf_counter) - в сериализацию текущего запроса (dump моделей в сервисах)"""
+    metrics = _current()
+    if metrics is not None:
+        metrics.serialize_time += time.perf_counter() - started
+
+
+def _instrument_engine(engine, slow_query_threshold):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        metrics = _current()
+        if metrics is not None:
+            metrics.sql_count += 1
+            metrics.sql_time += elapsed
+        if slow_query_threshold and elapsed * 1000 >= slow_query_threshold:
+            logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000,
+                           request.endpoint if has_request_context() else '-', statement)
+
+
+def _instrument_json(app):
+    """Время jsonify: оборачиваем response текущего JSON-провайдера (dump моделей - record_serialization)"""
+    response = app.json.response
+
+    def timed_response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return response(*args, **kwargs)
+        finally:
+            metrics = _current()
+            if metrics is not None:
+                metrics.serialize_time += time.perf_counter() - started
+
+    app.json.response = timed_response
+
+
+def instrument_engine(app, engine):
+    """Подсчёт SQL (METRICS_ENABLED) и лог медленных запросов (SLOW_QUERY_LOG_ENABLED) движка"""
+    threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] if app.config['SLOW_QUERY_LOG_ENABLED'] else 0
+    if app.config['METRICS_ENABLED'] or threshold:
+        _instrument_engine(engine, threshold)
+
+
+def init_metrics(app, engine):
+    """Сбор метрик запросов (METRICS_ENABLED): время ответа, число и время SQL, время сериализации.
+
+    Итоги отдаются в /metrics (формат Prometheus) и в заголовке Server-Timing каждого ответа.
+    Лог запросов дольше SLOW_QUERY_THRESHOLD_MS включается отдельно (SLOW_QUERY_LOG_ENABLED).
+    """
+    instrument_engine(app, engine)
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    _instrument_json(app)
+
+    @app.before_request
+    def _start_request_metrics():
+        g.request_metrics = RequestMetrics()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None or request.endpoint == 'metrics':
+            return response
+        duration = time.perf_counter() - metrics.started
+        registry.record(request.url_rule.rule if request.url_rule else 'unmatched',
+                        request.method, response.status_code, duration, metrics)
+        response.headers['Server-Timing'] = (
+            f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.sql_count} queries", '
+            f'serialize;dur={metrics.serialize_time * 1000:.2f}, '
+            f'total;dur={duration * 1000:.2f}'
+        )
+        return response
+
+    @app.route('/metrics', endpoint='metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
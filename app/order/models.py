@@ -17,9 +17,22 @@ class Order(db.Model):
 
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id', ondelete='SET NULL'))
 
+    # Поддерживаются OrderService при каждом изменении строк заказа
+    total = db.Column(db.Float, nullable=False, default=0, server_default='0')  # сумма quantity * price_at_order
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # сумма quantity
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     client = db.relationship('Client', backref=backref('orders', passive_deletes=True))
     products = db.relationship('OrderProduct', backref='order', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_orders_user_id_date', 'user_id', 'date'),
+        db.Index('ix_orders_client_id', 'client_id'),
+        db.Index('ix_orders_user_id_updated_at', 'user_id', 'updated_at'),
+        # AUTOINCREMENT: id удалённой строки не выдаётся повторно (tombstone /api/sync однозначен)
+        {'sqlite_autoincrement': True},
+    )
+
 
 class OrderProduct(db.Model):
     __tablename__ = 'order_products'
@@ -28,4 +41,8 @@ class OrderProduct(db.Model):
                            db.ForeignKey('products.id', ondelete='CASCADE'),  # Меняем на CASCADE
                            primary_key=True)
     quantity = db.Column(db.Integer, nullable=False, default=1)
-    price_at_order = db.Column(db.Float, nullable=False)
\ No newline at end of file
+    price_at_order = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_order_products_product_id', 'product_id'),
+    )
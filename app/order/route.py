@@ -1,12 +1,21 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from marshmallow import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
+from app.asgi import async_view
+from app.async_db import async_session
 from app.auth.auth import token_required
 from app.order.models import Order
 from app.services.order_service import OrderService
-from app.order.schemas import OrderSchema
+from app.services.export_service import ExportService
+from app.order.schemas import OrderSchema, order_schema, order_update_schema, order_products_patch_schema
+from app.caching import conditional_list
+from app.pagination import get_page_args
+from app.serializers import dump
+from app.services.change_service import ChangeService
 
 order_bp = Blueprint('order', __name__, url_prefix='/order')
 
@@ -17,9 +26,8 @@ def create_order(user_id):
     if data is None:
         return jsonify({"error": "No data"}), 400
 
-    schema = OrderSchema()
     try:
-        validated_data = schema.load(data)  # Валидация + преобразование
+        validated_data = order_schema.load(data)  # Валидация + преобразование
     except ValidationError as err:
         return jsonify(err.messages), 400
 
@@ -29,36 +37,111 @@ def create_order(user_id):
 
     return jsonify(order), 201
 
+
+@async_view('order.create_order')
+@token_required
+async def create_order_async(user_id):
+    data = request.json
+    if data is None:
+        return jsonify({"error": "No data"}), 400
+
+    try:
+        validated_data = order_schema.load(data)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    async with async_session() as session:
+        order, errors = await OrderService.create_order_async(session, user_id, validated_data)
+    if errors:
+        return jsonify(errors), 400
+
+    return jsonify(order), 201
+
 @order_bp.route('/', methods=['GET'])
 @token_required
+@conditional_list(ChangeService.ORDER)
 def get_orders(user_id):
-    orders = Order.query.filter_by(user_id=user_id).all()
-    return jsonify(OrderSchema(many=True).dump(orders)), 200
+    try:
+        limit, after = get_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    orders, errors = OrderService.get_orders(user_id, limit, after)
+    if errors:
+        return jsonify(errors), 400
+    return jsonify(orders), 200
 
-@order_bp.route('/<int:order_id>', methods=['GET'])
+
+@async_view('order.get_orders')
 @token_required
-def get_order(user_id, order_id):
+@conditional_list(ChangeService.ORDER)
+async def get_orders_async(user_id):
+    try:
+        limit, after = get_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    async with async_session() as session:
+        orders, errors = await OrderService.get_orders_async(session, user_id, limit, after)
+    if errors:
+        return jsonify(errors), 400
+    return jsonify(orders), 200
+
+
+def _parse_date_arg(name, end_of_range=False):
+    """ISO-дата или дата-время из query string; для конца диапазона дата без времени включается целиком"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_range and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+@order_bp.route('/export', methods=['GET'])
+@token_required
+def export_orders(user_id):
+    export_format = request.args.get('format', 'ndjson')
+    result, errors = ExportService.export('order', user_id, export_format)
+    if errors:
+        return jsonify(errors), 400
+
+    chunks, mimetype = result
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=orders.{export_format}'
+    return response
+
+
+@order_bp.route('/stats', methods=['GET'])
+@token_required
+def get_order_stats(user_id):
     try:
-        user_id = int(user_id)
+        date_from = _parse_date_arg('from')
+        date_to = _parse_date_arg('to', end_of_range=True)
     except ValueError:
-        return jsonify({"error": "Invalid user id"}), 400
+        return jsonify({'error': 'Invalid date, expected ISO 8601'}), 400
 
-    order = Order.query.get(order_id)
+    stats, errors = OrderService.get_stats(user_id, date_from, date_to)
+    if errors:
+        return jsonify(errors), 400
+    return jsonify(stats), 200
+
+
+@order_bp.route('/<int:order_id>', methods=['GET'])
+@token_required
+def get_order(user_id, order_id):
+    order = Order.query.options(selectinload(Order.products)).filter_by(id=order_id).first()
 
     if not order or order.user_id != user_id:
         return jsonify({'error': 'Order not found'}), 404
 
-    return jsonify(OrderSchema().dump(order)), 200
+    return jsonify(dump(OrderSchema, order)), 200
 
 
 @order_bp.route('/<int:order_id>', methods=['PUT'])
 @token_required
 def update_order(user_id, order_id):
-    try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({"error": "Invalid user id"}), 400
     order = Order.query.get(order_id)
 
     # Проверка прав доступа
@@ -67,9 +150,8 @@ def update_order(user_id, order_id):
 
     # Валидация
     data = request.json
-    schema = OrderSchema(partial=True)
     try:
-        validated_data = schema.load(data)  # Валидация + преобразование
+        validated_data = order_update_schema.load(data)  # Валидация + преобразование
     except ValidationError as err:
         return jsonify(err.messages), 400
 
@@ -81,13 +163,56 @@ def update_order(user_id, order_id):
     return jsonify(updated_order), 200
 
 
+@async_view('order.update_order')
+@token_required
+async def update_order_async(user_id, order_id):
+    async with async_session() as session:
+        # Строки заказа нужны сразу: ленивой загрузки в AsyncSession нет
+        order = await session.scalar(
+            select(Order).options(selectinload(Order.products)).where(Order.id == order_id)
+        )
+        if not order or order.user_id != user_id:
+            return jsonify({'error': 'Access denied'}), 403
+
+        try:
+            validated_data = order_update_schema.load(request.json)
+        except ValidationError as err:
+            return jsonify(err.messages), 400
+
+        updated_order, errors = await OrderService.update_order_async(session, user_id, order, validated_data)
+    if errors:
+        return jsonify(errors), 400
+
+    return jsonify(updated_order), 200
+
+
+@order_bp.route('/<int:order_id>/products', methods=['PATCH'])
+@token_required
+def patch_order_products(user_id, order_id):
+    order = Order.query.options(selectinload(Order.products)).filter_by(id=order_id).first()
+
+    if not order or order.user_id != user_id:
+        return jsonify({'error': 'Access denied'}), 403
+
+    data = request.json
+    if data is None:
+        return jsonify({"error": "No data"}), 400
+
+    try:
+        validated_data = order_products_patch_schema.load(data)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    updated_order, errors = OrderService.patch_order_products(user_id, order, validated_data)
+    if errors:
+        return jsonify(errors), 400
+
+    return jsonify(updated_order), 200
+
+
 @order_bp.route('/<int:order_id>', methods=['DELETE'])
 @token_required
 def delete_order(user_id, order_id):
-    try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({"error": "Invalid user id"}), 400
     order = Order.query.get(order_id)
 
     if not order or order.user_id != user_id:
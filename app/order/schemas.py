@@ -25,4 +25,18 @@ class OrderSchema(ma.SQLAlchemySchema):
     date = fields.DateTime(format="iso", required=True)
     client_id = ma.auto_field()
     user_id = ma.auto_field()
-    products = fields.Nested(OrderProductSchema, many=True, required=False)
\ No newline at end of file
+    total = ma.Float(dump_only=True)
+    item_count = ma.Integer(dump_only=True)
+    products = fields.Nested(OrderProductSchema, many=True, required=False)
+
+
+class OrderProductsPatchSchema(ma.Schema):
+    add = fields.Nested(OrderProductSchema, many=True, load_default=list)
+    remove = fields.List(fields.Integer(), load_default=list)
+
+
+# Схемы не хранят состояние между вызовами - один экземпляр на процесс
+order_schema = OrderSchema()
+order_update_schema = OrderSchema(partial=True)
+orders_schema = OrderSchema(many=True)
+order_products_patch_schema = OrderProductsPatchSchema()
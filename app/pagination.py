@@ -0,0 +1,62 @@
+import base64
+import binascii
+import json
+
+from flask import current_app
+
+
+def encode_cursor(values):
+    """Непрозрачный курсор: base64url от JSON-списка значений ключа сортировки"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def get_page_args(args):
+    """Чтение limit и after из query string; ValueError при некорректных значениях"""
+    default_limit = current_app.config['PAGE_SIZE_DEFAULT']
+    max_limit = current_app.config['PAGE_SIZE_MAX']
+
+    limit = args.get('limit')
+    if limit is None:
+        limit = default_limit
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('Invalid limit')
+        if limit < 1:
+            raise ValueError('Invalid limit')
+        limit = min(limit, max_limit)
+
+    after = args.get('after')
+    if after:
+        after = decode_cursor(after)
+    else:
+        after = None
+
+    return limit, after
+
+
+def paginate(query, limit, cursor_for):
+    """Keyset-страница: запрос уже отфильтрован по курсору и отсортирован по ключу"""
+    return split_page(query.limit(limit + 1).all(), limit, cursor_for)
+
+
+def split_page(rows, limit, cursor_for):
+    """Отрезание лишней (limit + 1)-й строки и курсор на следующую страницу"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(cursor_for(rows[-1]))
+    return rows, next_cursor
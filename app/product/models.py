@@ -9,6 +9,7 @@ class Product(db.Model):
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
     photo = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     orders = db.relationship('OrderProduct',
                            backref='product',
                            cascade='all, delete-orphan',
@@ -16,4 +17,15 @@ class Product(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'title', name='_user_product_uc'),
+        db.Index('ix_products_user_id_id', 'user_id', 'id'),
+        db.Index('ix_products_user_id_updated_at', 'user_id', 'updated_at'),
+        # AUTOINCREMENT: id удалённой строки не выдаётся повторно (tombstone /api/sync однозначен)
+        {'sqlite_autoincrement': True},
     )
+
+
+class Photo(db.Model):
+    """Файл в контентно-адресуемом хранилище фото и число продуктов, которые на него ссылаются"""
+    __tablename__ = 'photos'
+    filename = db.Column(db.String(255), primary_key=True)  # <sha256>.<ext>
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
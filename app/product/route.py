@@ -1,32 +1,64 @@
-from flask import Blueprint, request, jsonify, send_from_directory, current_app
+from flask import Blueprint, abort, request, jsonify, send_from_directory, current_app, Response, stream_with_context
+from marshmallow import ValidationError
 
 from app.product.models import Product
 from app.services.product_service import ProductService
-from app.product.schemas import ProductSchema
+from app.services.photo_service import PhotoService
+from app.services.export_service import ExportService
+from app.services.import_service import ImportService
+from app.product.schemas import product_schema, product_update_schema
+from app.caching import conditional_list, cache_immutable, cache_revalidate
+from app.pagination import get_page_args
+from app.services.change_service import ChangeService
+import mimetypes
 import os
 
+from urllib.parse import quote
+
+from werkzeug.security import safe_join
+
+from app.asgi import body_limit
 from app.auth.auth import decode_jwt, token_required
 
 product_bp = Blueprint('product', __name__, url_prefix='/product')
 
+# Запас сверх MAX_FILE_SIZE на остальные поля формы и границы multipart
+FORM_OVERHEAD = 64 * 1024
+
+
+@body_limit('product.create_product', 'product.update_product')
+def _upload_size_limit():
+    return current_app.config['MAX_FILE_SIZE'] + FORM_OVERHEAD
+
+
+def _limit_upload_size():
+    """Слишком большой запрос с фото отклоняется с 413 ещё до разбора формы"""
+    request.max_content_length = _upload_size_limit()
+
 
 @product_bp.route('/', methods=['POST'])
 @token_required
 def create_product(user_id):
+    _limit_upload_size()
 
-    # Обрабатываем multipart/form-data
-    data = request.form.to_dict()
-    print(data)
+    if request.is_json:
+        # JSON без фото - в том числе подзапросы /api/batch
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Invalid JSON body'}), 400
+        data = dict(data)
+        photo_file = None
+    else:
+        # Обрабатываем multipart/form-data
+        data = request.form.to_dict()
+        photo_file = request.files.get('photo')
     data['user_id'] = user_id
-    photo_file = request.files.get('photo')
-
-    # Валидация данных
-    schema = ProductSchema()
-    errors = schema.validate(data)
-    print(errors)
 
-    if errors:
-        return jsonify(errors), 400
+    # Валидация и преобразование типов одним проходом
+    try:
+        data = product_schema.load(data)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
 
     # Создание продукта
     product, errors = ProductService.create_product(
@@ -42,21 +74,76 @@ def create_product(user_id):
 
 @product_bp.route('/', methods=['GET'])
 @token_required
+@conditional_list(ChangeService.PRODUCT)
 def get_products(user_id):
-    products = Product.query.filter_by(user_id=user_id).all()
-    return jsonify(ProductSchema(many=True).dump(products)), 200
+    try:
+        limit, after = get_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    products, errors = ProductService.get_products(user_id, limit, after)
+    if errors:
+        return jsonify(errors), 400
+    return jsonify(products), 200
 
-@product_bp.route('/<int:product_id>', methods=['PUT'])
+
+@product_bp.route('/import', methods=['POST'])
 @token_required
-def update_product(user_id, product_id):
+def import_products(user_id):
+    try:
+        rows = ImportService.read_rows(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid user id'}), 400
+        report, errors = ImportService.import_products(user_id, rows)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if errors:
+        return jsonify(errors), 400
 
+    # Ни одна строка не прошла валидацию - это ошибка запроса целиком
+    status = 400 if report['errors'] and not report['imported'] else 201
+    return jsonify(report), status
+
+
+@product_bp.route('/export', methods=['GET'])
+@token_required
+def export_products(user_id):
+    export_format = request.args.get('format', 'ndjson')
+    result, errors = ExportService.export('product', user_id, export_format)
+    if errors:
+        return jsonify(errors), 400
+
+    chunks, mimetype = result
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{export_format}'
+    return response
+
+
+@product_bp.route('/search', methods=['GET'])
+@token_required
+def search_products(user_id):
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+
+    try:
+        limit, after = get_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    products, errors = ProductService.search_products(user_id, query, limit, after)
+    if errors:
+        return jsonify(errors), 400
+    return jsonify(products), 200
+
+
+@product_bp.route('/<int:product_id>', methods=['PUT'])
+@token_required
+def update_product(user_id, product_id):
+    _limit_upload_size()
     product = Product.query.get(product_id)
-    print(product)
     if not product or product.user_id != user_id:
         return jsonify({'error': 'Access denied'}), 403
 
@@ -71,11 +158,11 @@ def update_product(user_id, product_id):
     if not data and not photo_file:
         return jsonify({'error': 'No data provided'}), 400
 
-    schema = ProductSchema(partial=True)
     if data:
-        errors = schema.validate(data)
-        if errors:
-            return jsonify(errors), 400
+        try:
+            data = product_update_schema.load(data)
+        except ValidationError as err:
+            return jsonify(err.messages), 400
 
     updated_product, errors = ProductService.update_product(
         product=product,
@@ -91,10 +178,6 @@ def update_product(user_id, product_id):
 @product_bp.route('/<int:product_id>', methods=['DELETE'])
 @token_required
 def delete_product(user_id, product_id):
-    try:
-        user_id = int(user_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid user id'}), 400
     product = Product.query.get(product_id)
 
     if not product or product.user_id != user_id:
@@ -107,11 +190,37 @@ def delete_product(user_id, product_id):
 @product_bp.route('/photo/<filename>', methods=['GET'])
 @token_required
 def get_photo(user_id, filename):
-    print(int(user_id))
-    print("work")
-    print(filename)
-    return send_from_directory(
-        directory=current_app.config['UPLOAD_FOLDER'],
-        path=filename,
-        as_attachment=False
-    )
+    size = request.args.get('size', PhotoService.ORIGINAL)
+    try:
+        directory, path, exact = PhotoService.get_variant(filename, size)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if current_app.config['PHOTO_SENDFILE'] == 'x-accel-redirect':
+        response = _accel_redirect(directory, path)
+    else:
+        # Werkzeug отдаёт файл через wsgi.file_wrapper (sendfile у gunicorn/uWSGI),
+        # обрабатывает Range/If-Range, а при USE_X_SENDFILE только ставит заголовок X-Sendfile
+        response = send_from_directory(
+            directory=directory,
+            path=path,
+            as_attachment=False,
+            conditional=True
+        )
+    if not exact:
+        # Вместо варианта отдан оригинал: под URL варианта его нельзя кэшировать навсегда
+        return cache_revalidate(response)
+    return cache_immutable(response)
+
+
+def _accel_redirect(directory, path):
+    """Пустой ответ с X-Accel-Redirect: файл (и Range) отдаёт nginx из internal location"""
+    full_path = safe_join(directory, path)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)  # как send_from_directory для отсутствующего файла
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    relative_path = os.path.relpath(full_path, upload_folder).replace(os.sep, '/')
+    response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+    response.headers['X-Accel-Redirect'] = current_app.config['PHOTO_ACCEL_PREFIX'] + quote(relative_path)
+    return response
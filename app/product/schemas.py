@@ -13,3 +13,9 @@ class ProductSchema(ma.SQLAlchemySchema):
     price = ma.auto_field(validate=validate.Range(min=0.01))
     photo = ma.auto_field()
     user_id = ma.auto_field()
+
+
+# Схемы не хранят состояние между вызовами - один экземпляр на процесс
+product_schema = ProductSchema()
+product_update_schema = ProductSchema(partial=True)
+products_schema = ProductSchema(many=True)
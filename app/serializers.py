@@ -0,0 +1,90 @@
+import time
+from operator import attrgetter
+
+from flask import current_app
+
+from app.client.schemas import ClientSchema, client_schema, clients_schema
+from app.metrics import record_serialization
+from app.order.schemas import OrderSchema, order_schema, orders_schema
+from app.product.schemas import ProductSchema, product_schema, products_schema
+
+
+def _nullable(convert):
+    return lambda value: None if value is None else convert(value)
+
+
+# Те же преобразования, что у полей marshmallow при dump
+_int = _nullable(int)
+_float = _nullable(float)
+_str = _nullable(str)
+_iso = _nullable(lambda value: value.isoformat())
+
+
+def compile_serializer(fields):
+    """Функция obj -> dict по списку (имя, преобразование).
+
+    obj - модель или строка результата select с теми же именами колонок.
+    """
+    names = tuple(name for name, _ in fields)
+    converters = tuple(convert for _, convert in fields)
+    getter = attrgetter(*names)
+
+    def serialize(obj):
+        return {name: convert(value) for name, convert, value in zip(names, converters, getter(obj))}
+    return serialize
+
+
+serialize_product = compile_serializer([
+    ('id', _int), ('title', _str), ('description', _str), ('price', _float), ('photo', _str), ('user_id', _int),
+])
+
+serialize_client = compile_serializer([
+    ('id', _int), ('first_name', _str), ('last_name', _str), ('phone', _str), ('user_id', _int),
+])
+
+serialize_order_line = compile_serializer([
+    ('product_id', _int), ('quantity', _int), ('price_at_order', _float),
+])
+
+_serialize_order_fields = compile_serializer([
+    ('id', _int), ('title', _str), ('address', _str), ('date', _iso), ('client_id', _int), ('user_id', _int),
+    ('total', _float), ('item_count', _int),
+])
+
+
+def serialize_order(order):
+    data = _serialize_order_fields(order)
+    data['products'] = [serialize_order_line(line) for line in order.products]
+    return data
+
+
+# Экземпляры схем для медленного пути: (один объект, список)
+SCHEMAS = {
+    ProductSchema: (product_schema, products_schema),
+    ClientSchema: (client_schema, clients_schema),
+    OrderSchema: (order_schema, orders_schema),
+}
+
+SERIALIZERS = {
+    ProductSchema: serialize_product,
+    ClientSchema: serialize_client,
+    OrderSchema: serialize_order,
+}
+
+
+def dump(schema_class, obj, many=False):
+    """Сериализация для ответа: быстрый путь при FAST_SERIALIZATION, иначе dump схемы marshmallow.
+
+    Время попадает в метрику сериализации запроса.
+    """
+    started = time.perf_counter()
+    try:
+        if not current_app.config['FAST_SERIALIZATION']:
+            single, plural = SCHEMAS[schema_class]
+            return (plural if many else single).dump(obj)
+        serialize = SERIALIZERS[schema_class]
+        if many:
+            return [serialize(item) for item in obj]
+        return serialize(obj)
+    finally:
+        record_serialization(started)
@@ -0,0 +1,99 @@
+import logging
+
+from flask import current_app, g
+from werkzeug.exceptions import HTTPException
+
+from app.extensions import db, begin_transaction
+
+logger = logging.getLogger(__name__)
+
+
+class _Savepoint:
+    """Подзапрос атомарного пакета в SAVEPOINT общей транзакции.
+
+    commit() сервиса превращается во flush(), а rollback() откатывает только
+    изменения этого подзапроса, а не предыдущие подзапросы пакета.
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    def __enter__(self):
+        self.transaction = self._session.begin_nested()
+        self._session.commit = self._session.flush
+        self._session.rollback = self._rollback
+        return self
+
+    def _rollback(self):
+        if self.transaction.is_active:
+            self.transaction.rollback()
+
+    def __exit__(self, *exc_info):
+        del self._session.commit
+        del self._session.rollback
+        if self.transaction.is_active:
+            self.transaction.commit()
+
+
+class BatchService:
+    @staticmethod
+    def _dispatch(sub_request):
+        """Выполнение одного подзапроса через зарегистрированный обработчик маршрута"""
+        method = sub_request['method']
+        path = sub_request['path']
+        try:
+            adapter = current_app.url_map.bind('')
+            endpoint, view_args = adapter.match(path.split('?', 1)[0], method=method)
+        except HTTPException as e:
+            return {'status': e.code, 'body': {'error': e.description}}
+
+        if endpoint == 'batch.execute_batch':
+            return {'status': 400, 'body': {'error': 'Nested batch requests are not allowed'}}
+
+        with current_app.test_request_context(path, method=method, json=sub_request['body']):
+            try:
+                response = current_app.make_response(current_app.view_functions[endpoint](**view_args))
+            except HTTPException as e:
+                return {'status': e.code, 'body': {'error': e.description}}
+            except Exception:
+                # Результаты предыдущих подзапросов остаются в ответе; откатывается только этот
+                logger.exception('Batch sub-request %s %s failed', method, path)
+                db.session.rollback()
+                return {'status': 500, 'body': {'error': 'Internal error'}}
+
+            body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+            return {'status': response.status_code, 'body': body}
+
+    @staticmethod
+    def execute(user_id, requests, atomic=False):
+        if len(requests) > current_app.config['BATCH_MAX_REQUESTS']:
+            return None, {'error': f"Too many requests, maximum is {current_app.config['BATCH_MAX_REQUESTS']}"}
+
+        # Токен проверен один раз для всего пакета; token_required подзапросов берёт user_id отсюда
+        g.batch_user_id = user_id
+        results = []
+        try:
+            if not atomic:
+                for sub_request in requests:
+                    results.append(BatchService._dispatch(sub_request))
+                return {'atomic': False, 'results': results}, None
+
+            session = db.session()
+            begin_transaction(session)
+            for sub_request in requests:
+                with _Savepoint(session):
+                    result = BatchService._dispatch(sub_request)
+                results.append(result)
+                if result['status'] >= 400:
+                    session.rollback()
+                    return {'atomic': True, 'committed': False, 'failed_index': len(results) - 1,
+                            'results': results}, None
+            session.commit()
+            return {'atomic': True, 'committed': True, 'results': results}, None
+
+        except Exception:
+            logger.exception('Batch commit failed')
+            db.session.rollback()
+            return None, {'error': 'Internal error'}
+        finally:
+            g.pop('batch_user_id', None)
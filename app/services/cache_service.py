@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.user.models import ChangeCounter
+
+try:
+    import redis
+except ImportError:  # redis не установлен - доступен только кэш в памяти процесса
+    redis = None
+
+
+class MemoryCacheBackend:
+    """LRU в памяти процесса с ограничением по числу записей и времени жизни"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # ключ -> (значение, момент истечения)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value):
+        """Запись без срока жизни, только если ключа ещё нет; возвращает итоговое значение"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Общий для всех процессов кэш в Redis (или совместимом локальном сервере)"""
+
+    def __init__(self, url, prefix='packwa:'):
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self._prefix + key, json.dumps(value), ex=ttl or None)
+
+    def add(self, key, value):
+        self._client.set(self._prefix + key, json.dumps(value), nx=True)
+        return self.get(key)
+
+    def clear(self):
+        for key in self._client.scan_iter(self._prefix + '*'):
+            self._client.delete(key)
+
+
+class CacheService:
+    """Кэш ответов на чтение по арендатору (user_id) и ресурсу.
+
+    В ключ записи входит поколение пары (user_id, ресурс); сброс - это новое поколение,
+    старые записи вытесняются по LRU/TTL. Поколение - момент сброса в наносекундах,
+    поэтому потеря ключа поколения не возвращает к старым записям.
+    Сброс откладывается до коммита транзакции, в которой были изменения.
+
+    Кроме поколения, в ключ входит версия ресурса из ChangeCounter (один запрос по индексу):
+    запись в другом процессе меняет её в БД, поэтому кэш 'memory' в каждом воркере
+    не отдаёт устаревшие списки.
+    """
+    # Счётчики попаданий и промахов по ресурсам для /metrics
+    _stats = {}
+    _stats_lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app):
+        backend = app.config['CATALOG_CACHE_BACKEND']
+        if backend == 'memory':
+            cache = MemoryCacheBackend(app.config['CATALOG_CACHE_SIZE'])
+        elif backend == 'redis':
+            if redis is None:
+                raise RuntimeError("CATALOG_CACHE_BACKEND='redis' requires the redis package")
+            cache = RedisCacheBackend(app.config['CATALOG_CACHE_URL'])
+        else:
+            cache = None
+        app.extensions['catalog_cache'] = cache
+
+    @staticmethod
+    def _backend():
+        return current_app.extensions.get('catalog_cache')
+
+    @staticmethod
+    def _generation(cache, user_id, resource):
+        return cache.add(f'gen:{resource}:{user_id}', time.time_ns())
+
+    @staticmethod
+    def _count(resource, hit):
+        with CacheService._stats_lock:
+            hits, misses = CacheService._stats.get(resource, (0, 0))
+            CacheService._stats[resource] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+    @staticmethod
+    def stats():
+        with CacheService._stats_lock:
+            return dict(CacheService._stats)
+
+    @staticmethod
+    def get_or_load(user_id, resource, key, loader):
+        """Результат loader() -> (result, errors) из кэша; ошибки не кэшируются"""
+        cache = CacheService._backend()
+        # В этой же транзакции уже были изменения (например, атомарный /api/batch) - кэш не годится
+        if cache is None or (user_id, resource) in db.session.info.get('cache_invalidations', ()):
+            return loader()
+
+        generation = CacheService._generation(cache, user_id, resource)
+        version = db.session.query(ChangeCounter.version).filter_by(user_id=user_id, resource=resource).scalar()
+        cache_key = f'{resource}:{user_id}:{generation}:{version or 0}:{key}'
+        cached = cache.get(cache_key)
+        CacheService._count(resource, hit=cached is not None)
+        if cached is not None:
+            return cached, None
+
+        result, errors = loader()
+        if not errors:
+            cache.set(cache_key, result, current_app.config['CATALOG_CACHE_TTL'])
+        return result, errors
+
+    @staticmethod
+    def invalidate(user_id, *resources, session=None):
+        """Сброс кэша ресурсов арендатора после коммита транзакции session (по умолчанию db.session)"""
+        pending = (session or db.session).info.setdefault('cache_invalidations', set())
+        pending.update((user_id, resource) for resource in resources)
+
+    @staticmethod
+    def _apply(pending):
+        cache = CacheService._backend()
+        if cache is None:
+            return
+        for user_id, resource in pending:
+            cache.set(f'gen:{resource}:{user_id}', time.time_ns())
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # RELEASE SAVEPOINT (атомарный /api/batch) - ещё не коммит
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop('cache_invalidations', None)
+    if pending and has_app_context():
+        CacheService._apply(pending)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    # Откат точки сохранения не отменяет сбросы из остальной транзакции; лишний сброс безвреден
+    if previous_transaction.nested:
+        return
+    session.info.pop('cache_invalidations', None)
@@ -0,0 +1,53 @@
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.services.cache_service import CacheService
+from app.user.models import ChangeCounter
+
+
+class ChangeService:
+    PRODUCT = 'product'
+    CLIENT = 'client'
+    ORDER = 'order'
+
+    @staticmethod
+    def bump(user_id, *resources):
+        """Увеличение счётчиков в текущей транзакции (коммит делает вызывающий сервис).
+
+        Каждая запись, меняющая список, проходит здесь - тут же планируется сброс кэша чтения.
+        """
+        CacheService.invalidate(user_id, *resources)
+        for resource in resources:
+            updated = ChangeCounter.query.filter_by(user_id=user_id, resource=resource).update(
+                {ChangeCounter.version: ChangeCounter.version + 1}
+            )
+            if not updated:
+                db.session.add(ChangeCounter(user_id=user_id, resource=resource, version=1))
+
+    @staticmethod
+    async def bump_async(session, user_id, *resources):
+        """bump для AsyncSession"""
+        CacheService.invalidate(user_id, *resources, session=session)
+        for resource in resources:
+            result = await session.execute(
+                update(ChangeCounter)
+                .where(ChangeCounter.user_id == user_id, ChangeCounter.resource == resource)
+                .values(version=ChangeCounter.version + 1)
+            )
+            if not result.rowcount:
+                session.add(ChangeCounter(user_id=user_id, resource=resource, version=1))
+
+    @staticmethod
+    def get_version(user_id, resource):
+        version = db.session.query(ChangeCounter.version).filter_by(
+            user_id=user_id,
+            resource=resource
+        ).scalar()
+        return version or 0
+
+    @staticmethod
+    async def get_version_async(session, user_id, resource):
+        version = await session.scalar(
+            select(ChangeCounter.version).where(ChangeCounter.user_id == user_id, ChangeCounter.resource == resource)
+        )
+        return version or 0
@@ -1,28 +1,36 @@
+from datetime import datetime
+
 from sqlalchemy.exc import IntegrityError
 from app.extensions import db
 from app.client.models import Client
+from app.order.models import Order
 from app.client.schemas import ClientSchema
+from app.pagination import paginate
+from app.serializers import dump
+from app.services.cache_service import CacheService
+from app.services.change_service import ChangeService
+from app.services.search_service import SearchService
+from app.services.sync_service import SyncService
 
 
 class ClientService:
     @staticmethod
     def create_client(user_id, client_data):
-        schema = ClientSchema()
-        errors = schema.validate(client_data)
-        if errors:
-            return None, errors
-
+        """client_data - результат client_schema.load в маршруте"""
         try:
             new_client = Client(
                 user_id=user_id,
                 first_name=client_data['first_name'],
-                last_name=client_data['last_name'],
+                last_name=client_data.get('last_name'),
                 phone=client_data.get('phone')
             )
 
             db.session.add(new_client)
+            db.session.flush()
+            SearchService.index_client(new_client)
+            ChangeService.bump(user_id, ChangeService.CLIENT)
             db.session.commit()
-            return schema.dump(new_client), None
+            return dump(ClientSchema, new_client), None
 
         except IntegrityError as e:
             db.session.rollback()
@@ -32,9 +40,35 @@ class ClientService:
             return None, {'error': str(e)}
 
     @staticmethod
-    def get_all_clients(user_id):
-        clients = Client.query.filter_by(user_id=user_id).all()
-        return ClientSchema(many=True).dump(clients), None
+    def get_all_clients(user_id, limit, after=None):
+        return CacheService.get_or_load(
+            user_id, ChangeService.CLIENT, f'page:{limit}:{after}',
+            lambda: ClientService._load_clients(user_id, limit, after)
+        )
+
+    @staticmethod
+    def _load_clients(user_id, limit, after):
+        query = Client.query.filter_by(user_id=user_id)
+        if after is not None:
+            try:
+                (last_id,) = after
+                last_id = int(last_id)
+            except (TypeError, ValueError):
+                return None, {'error': 'Invalid cursor'}
+            query = query.filter(Client.id > last_id)
+
+        clients, next_cursor = paginate(query.order_by(Client.id), limit, lambda c: [c.id])
+        return {'items': dump(ClientSchema, clients, many=True), 'next': next_cursor}, None
+
+    @staticmethod
+    def search_clients(user_id, query, limit, after=None):
+        if not SearchService.enabled():
+            return None, {'error': 'Search is not available'}
+        try:
+            clients, next_cursor = SearchService.search_clients(user_id, query, limit, after)
+        except ValueError as e:
+            return None, {'error': str(e)}
+        return {'items': dump(ClientSchema, clients, many=True), 'next': next_cursor}, None
 
     @staticmethod
     def update_client(client, update_data):
@@ -54,8 +88,10 @@ class ClientService:
                 if hasattr(client, key):  # Обновляем только допустимые поля
                     setattr(client, key, value)
 
+            SearchService.index_client(client)
+            ChangeService.bump(client.user_id, ChangeService.CLIENT)
             db.session.commit()
-            return ClientSchema().dump(client), None
+            return dump(ClientSchema, client), None
 
         except IntegrityError as e:
             db.session.rollback()
@@ -70,7 +106,16 @@ class ClientService:
             return {'error': 'Client not found'}, 404
 
         try:
+            # ON DELETE SET NULL выполняем явно, чтобы заказы попали в инкрементальную синхронизацию
+            Order.query.filter_by(client_id=client.id).update(
+                {Order.client_id: None, Order.updated_at: datetime.utcnow()},
+                synchronize_session=False
+            )
             db.session.delete(client)
+            SearchService.remove_client(client.id)
+            SyncService.record_deletion(client.user_id, ChangeService.CLIENT, client.id)
+            # У заказов клиента обнуляется client_id - меняется и список заказов
+            ChangeService.bump(client.user_id, ChangeService.CLIENT, ChangeService.ORDER)
             db.session.commit()
             return {'message': 'Client deleted successfully'}, 200
         except Exception as e:
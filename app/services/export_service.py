@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from app.client.models import Client
+from app.client.schemas import ClientSchema
+from app.order.models import Order
+from app.order.schemas import OrderSchema
+from app.product.models import Product
+from app.product.schemas import ProductSchema
+from app.serializers import dump
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+PRODUCT_FIELDS = ['id', 'title', 'description', 'price', 'photo', 'user_id']
+CLIENT_FIELDS = ['id', 'first_name', 'last_name', 'phone', 'user_id']
+ORDER_FIELDS = ['id', 'title', 'address', 'date', 'client_id', 'user_id', 'total', 'item_count']
+ORDER_LINE_FIELDS = ['product_id', 'quantity', 'price_at_order']
+
+
+class ExportService:
+    """Потоковая выгрузка: строки читаются пачками (yield_per) и сразу отдаются клиенту"""
+
+    @staticmethod
+    def _batched(query):
+        return query.yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+
+    @staticmethod
+    def _product_records(user_id):
+        query = Product.query.filter_by(user_id=user_id).order_by(Product.id)
+        for product in ExportService._batched(query):
+            yield dump(ProductSchema, product)
+
+    @staticmethod
+    def _client_records(user_id):
+        query = Client.query.filter_by(user_id=user_id).order_by(Client.id)
+        for client in ExportService._batched(query):
+            yield dump(ClientSchema, client)
+
+    @staticmethod
+    def _order_records(user_id):
+        # selectinload подгружает строки заказов одним запросом на каждую пачку
+        query = Order.query.options(selectinload(Order.products)) \
+            .filter_by(user_id=user_id).order_by(Order.id)
+        for order in ExportService._batched(query):
+            yield dump(OrderSchema, order)
+
+    @staticmethod
+    def _order_csv_rows(records):
+        """Заказ в CSV - по строке на каждую позицию (поля заказа повторяются)"""
+        for record in records:
+            lines = record.pop('products', None) or [{}]
+            for line in lines:
+                yield {**record, **line}
+
+    @staticmethod
+    def _ndjson(records):
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    @staticmethod
+    def _csv(rows, fieldnames):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # Заголовок пустой выгрузки
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def export(resource, user_id, export_format):
+        """Генератор фрагментов ответа и mimetype, либо ошибка"""
+        if export_format not in EXPORT_MIMETYPES:
+            return None, {'error': f"Unsupported format, use one of: {', '.join(EXPORT_MIMETYPES)}"}
+
+        if resource == 'product':
+            records, fieldnames = ExportService._product_records(user_id), PRODUCT_FIELDS
+        elif resource == 'client':
+            records, fieldnames = ExportService._client_records(user_id), CLIENT_FIELDS
+        elif resource == 'order':
+            records = ExportService._order_records(user_id)
+            fieldnames = ORDER_FIELDS + ORDER_LINE_FIELDS
+            if export_format == 'csv':
+                records = ExportService._order_csv_rows(records)
+        else:
+            return None, {'error': 'Unknown resource'}
+
+        if export_format == 'ndjson':
+            chunks = ExportService._ndjson(records)
+        else:
+            chunks = ExportService._csv(records, fieldnames)
+        return (chunks, EXPORT_MIMETYPES[export_format]), None
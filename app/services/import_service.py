@@ -0,0 +1,132 @@
+import csv
+import io
+
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import insert
+
+from app.client.models import Client
+from app.client.schemas import clients_schema
+from app.extensions import db
+from app.product.models import Product
+from app.product.schemas import products_schema
+from app.services.change_service import ChangeService
+from app.services.search_service import SearchService
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ImportService:
+    @staticmethod
+    def read_rows(request):
+        """Строки импорта из JSON-массива, тела text/csv или файла file в multipart"""
+        if request.is_json:
+            rows = request.get_json(silent=True)
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError('Expected a JSON array of objects')
+            return rows
+
+        if 'file' in request.files:
+            raw = request.files['file'].read()
+        elif request.mimetype == 'text/csv':
+            raw = request.get_data()
+        else:
+            raise ValueError('Expected a JSON array or CSV data')
+
+        try:
+            reader = csv.DictReader(io.StringIO(raw.decode('utf-8-sig')))
+        except UnicodeDecodeError:
+            raise ValueError('CSV must be UTF-8 encoded')
+        # Пустые ячейки CSV считаем отсутствующими значениями
+        return [{key: value for key, value in row.items() if key and value != ''} for row in reader]
+
+    @staticmethod
+    def _load(schema, user_id, rows):
+        """Валидация пачки одним проходом: (валидные строки с индексами, ошибки по индексам)"""
+        if len(rows) > current_app.config['IMPORT_MAX_ROWS']:
+            raise ValueError(f"Too many rows, maximum is {current_app.config['IMPORT_MAX_ROWS']}")
+        try:
+            loaded = schema.load([{**row, 'user_id': user_id} for row in rows])
+            errors = {}
+        except ValidationError as err:
+            loaded = err.valid_data
+            errors = err.messages
+        valid = [(index, data) for index, data in enumerate(loaded) if index not in errors]
+        return valid, errors
+
+    @staticmethod
+    def _bulk_insert(model, values):
+        """Многострочный INSERT пачками по IMPORT_BATCH_SIZE.
+
+        RETURNING без сохранения порядка (иначе SQLite вставляет по одной строке):
+        вставленные строки возвращаются целиком и сразу идут в полнотекстовый индекс.
+        """
+        returned = []
+        columns = [model.id] + [getattr(model, key) for key in values[0]]
+        for chunk in _chunks(values, current_app.config['IMPORT_BATCH_SIZE']):
+            returned.extend(
+                dict(row) for row in db.session.execute(insert(model).returning(*columns), chunk).mappings()
+            )
+        return returned
+
+    @staticmethod
+    def import_products(user_id, rows):
+        valid, errors = ImportService._load(products_schema, user_id, rows)
+
+        # Уникальность названий (_user_product_uc): одна выборка по всем названиям пачки
+        titles = list({data['title'] for _, data in valid})
+        taken = set()
+        for chunk in _chunks(titles, current_app.config['IMPORT_BATCH_SIZE']):
+            taken.update(db.session.scalars(
+                db.select(Product.title).where(Product.user_id == user_id, Product.title.in_(chunk))
+            ))
+
+        values = []
+        for index, data in valid:
+            if data['title'] in taken:
+                errors[index] = {'title': ['Product`s title already exists for this user']}
+                continue
+            taken.add(data['title'])
+            values.append({
+                'user_id': user_id,
+                'title': data['title'],
+                'description': data.get('description'),
+                'price': data['price'],
+            })
+
+        return ImportService._commit(Product, ChangeService.PRODUCT, SearchService.index_products,
+                                     user_id, values, errors)
+
+    @staticmethod
+    def import_clients(user_id, rows):
+        valid, errors = ImportService._load(clients_schema, user_id, rows)
+
+        values = [{
+            'user_id': user_id,
+            'first_name': data['first_name'],
+            'last_name': data.get('last_name'),
+            'phone': data.get('phone'),
+        } for _, data in valid]
+
+        return ImportService._commit(Client, ChangeService.CLIENT, SearchService.index_clients,
+                                     user_id, values, errors)
+
+    @staticmethod
+    def _commit(model, resource, index_rows, user_id, values, errors):
+        report = {'imported': 0, 'errors': {str(index): messages for index, messages in sorted(errors.items())}}
+        if not values:
+            return report, None
+
+        try:
+            index_rows(ImportService._bulk_insert(model, values))
+            ChangeService.bump(user_id, resource)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return None, {'error': str(e)}
+
+        report['imported'] = len(values)
+        return report, None
@@ -1,28 +1,63 @@
+import logging
 from datetime import datetime
+from sqlalchemy import tuple_, select, update, func
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 
 from app.client.models import Client
 from app.extensions import db
 from app.order.models import Order, OrderProduct
 from app.order.schemas import OrderSchema
+from app.pagination import paginate, split_page
+from app.serializers import dump
+from app.services.change_service import ChangeService
+from app.services.sync_service import SyncService
 from app.product.models import Product
 
+logger = logging.getLogger(__name__)
+
 
 class OrderService:
+    @staticmethod
+    def _products_stmt(user_id, requested_ids):
+        return select(Product).where(Product.id.in_(requested_ids), Product.user_id == user_id)
+
     @staticmethod
     def _validate_products(user_id, products_data):
-        """Проверка продуктов и получение их текущих цен"""
-        valid_products = []
-        for item in products_data:
-            product = Product.query.filter(
-                Product.id == item['product_id'],
-                Product.user_id == user_id
-            ).first()
+        """Проверка продуктов и получение их текущих цен (одним запросом)"""
+        requested_ids = {item['product_id'] for item in products_data}
+        products = {}
+        if requested_ids:
+            products = {
+                product.id: product
+                for product in db.session.scalars(OrderService._products_stmt(user_id, requested_ids))
+            }
+        return OrderService._order_lines(products_data, requested_ids, products)
+
+    @staticmethod
+    async def _validate_products_async(session, user_id, products_data):
+        requested_ids = {item['product_id'] for item in products_data}
+        products = {}
+        if requested_ids:
+            products = {
+                product.id: product
+                for product in await session.scalars(OrderService._products_stmt(user_id, requested_ids))
+            }
+        return OrderService._order_lines(products_data, requested_ids, products)
 
-            if not product:
-                raise ValueError(f"Product {item['product_id']} not found")
+    @staticmethod
+    def _order_lines(products_data, requested_ids, products):
+        """Строки заказа с текущими ценами; ValueError, если каких-то продуктов нет"""
+        missing = [pid for pid in requested_ids if pid not in products]
+        if missing:
+            missing_ids = ', '.join(str(pid) for pid in sorted(missing))
+            if len(missing) == 1:
+                raise ValueError(f"Product {missing_ids} not found")
+            raise ValueError(f"Products {missing_ids} not found")
 
+        valid_products = []
+        for item in products_data:
+            product = products[item['product_id']]
             valid_products.append({
                 'product_id': product.id,
                 'quantity': item.get('quantity', 1),
@@ -30,24 +65,181 @@ class OrderService:
             })
         return valid_products
 
+    @staticmethod
+    def _client_stmt(user_id, client_id):
+        return select(Client.id).where(Client.id == client_id, Client.user_id == user_id)
+
     @staticmethod
     def _validate_client(user_id, client_id):
         """Проверка существования клиента"""
         if client_id is not None:
-            client = Client.query.filter(
-                Client.id == client_id,
-                Client.user_id == user_id
-            ).first()
+            if db.session.scalar(OrderService._client_stmt(user_id, client_id)) is None:
+                raise ValueError("Client not found")
+        return True
 
-            if not client:
+    @staticmethod
+    async def _validate_client_async(session, user_id, client_id):
+        if client_id is not None:
+            if await session.scalar(OrderService._client_stmt(user_id, client_id)) is None:
                 raise ValueError("Client not found")
         return True
 
+    @staticmethod
+    def _unique_lines(products_data):
+        """Строки по product_id; ValueError, если продукт указан дважды"""
+        lines = {}
+        for op_data in products_data:
+            if op_data['product_id'] in lines:
+                raise ValueError(f"Product {op_data['product_id']} is duplicated in order")
+            lines[op_data['product_id']] = op_data
+        return lines
+
+    @staticmethod
+    def _sync_order_products(order, products_data):
+        """Приведение строк заказа к новому списку: только нужные INSERT/UPDATE/DELETE"""
+        incoming = OrderService._unique_lines(products_data)
+        existing = {line.product_id: line for line in order.products}
+
+        # Удаляем строки, которых нет в новом списке (delete-orphan)
+        for product_id, line in existing.items():
+            if product_id not in incoming:
+                order.products.remove(line)
+
+        OrderService._upsert_order_products(order, incoming.values(), existing)
+
+    @staticmethod
+    def _upsert_order_products(order, products_data, existing=None):
+        """Добавление новых строк и обновление изменившихся"""
+        if existing is None:
+            existing = {line.product_id: line for line in order.products}
+
+        for op_data in products_data:
+            line = existing.get(op_data['product_id'])
+            if line is None:
+                order.products.append(OrderProduct(**op_data))
+                continue
+            # UPDATE уйдёт в БД только если значения действительно изменились
+            if line.quantity != op_data['quantity']:
+                line.quantity = op_data['quantity']
+            if line.price_at_order != op_data['price_at_order']:
+                line.price_at_order = op_data['price_at_order']
+
+    @staticmethod
+    def _recalculate_order_totals(order):
+        """Пересчёт total/item_count по уже загруженным строкам заказа"""
+        order.total = sum(line.quantity * line.price_at_order for line in order.products)
+        order.item_count = sum(line.quantity for line in order.products)
+
+    @staticmethod
+    def recalculate_totals(order_ids=None, touch=False):
+        """Пересчёт total/item_count на стороне БД (все заказы или указанные); коммит - за вызывающим.
+
+        touch=True обновляет и updated_at - для изменений, которые должны попасть в синхронизацию.
+        """
+        total = select(
+            func.coalesce(func.sum(OrderProduct.quantity * OrderProduct.price_at_order), 0)
+        ).where(OrderProduct.order_id == Order.id).scalar_subquery()
+        item_count = select(
+            func.coalesce(func.sum(OrderProduct.quantity), 0)
+        ).where(OrderProduct.order_id == Order.id).scalar_subquery()
+
+        values = {'total': total, 'item_count': item_count}
+        if touch:
+            values['updated_at'] = datetime.utcnow()
+        stmt = update(Order).values(**values)
+        if order_ids is not None:
+            if not order_ids:
+                return
+            stmt = stmt.where(Order.id.in_(order_ids))
+        db.session.execute(stmt, execution_options={'synchronize_session': False})
+
     @staticmethod
     def _get_product_price(product_id):
         product = Product.query.get(product_id)
         return product.price if product else None
 
+    @staticmethod
+    def _orders_filters(user_id, after):
+        """Условия выборки страницы заказов; ValueError при некорректном курсоре"""
+        filters = [Order.user_id == user_id]
+        if after is not None:
+            try:
+                last_date, last_id = after
+                last_date = datetime.fromisoformat(last_date)
+                last_id = int(last_id)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid cursor')
+            filters.append(tuple_(Order.date, Order.id) > tuple_(last_date, last_id))
+        return filters
+
+    @staticmethod
+    def _order_cursor(order):
+        return [order.date.isoformat(), order.id]
+
+    @staticmethod
+    def get_orders(user_id, limit, after=None):
+        try:
+            filters = OrderService._orders_filters(user_id, after)
+        except ValueError as e:
+            return None, {'error': str(e)}
+
+        # Строки заказов подгружаются одним дополнительным запросом (без N+1)
+        orders, next_cursor = paginate(
+            Order.query.options(selectinload(Order.products)).filter(*filters).order_by(Order.date, Order.id),
+            limit,
+            OrderService._order_cursor
+        )
+        return {'items': dump(OrderSchema, orders, many=True), 'next': next_cursor}, None
+
+    @staticmethod
+    async def get_orders_async(session, user_id, limit, after=None):
+        try:
+            filters = OrderService._orders_filters(user_id, after)
+        except ValueError as e:
+            return None, {'error': str(e)}
+
+        rows = await session.scalars(
+            select(Order).options(selectinload(Order.products)).where(*filters)
+            .order_by(Order.date, Order.id).limit(limit + 1)
+        )
+        orders, next_cursor = split_page(rows.all(), limit, OrderService._order_cursor)
+        return {'items': dump(OrderSchema, orders, many=True), 'next': next_cursor}, None
+
+    @staticmethod
+    def _new_order(user_id, order_data, products_data):
+        order = Order(
+            user_id=user_id,
+            title=order_data['title'],
+            address=order_data.get('address'),
+            date=order_data['date'],
+            client_id=order_data.get('client_id'),
+            # Пустая коллекция задаётся явно: иначе сериализация подгрузит её лениво, а AsyncSession так не умеет
+            products=[]
+        )
+        for op_data in products_data:
+            order.products.append(OrderProduct(**op_data))
+        OrderService._recalculate_order_totals(order)
+        return order
+
+    @staticmethod
+    def _apply_order_update(order, update_data, products_data):
+        """Изменение полей и строк заказа по уже проверенным данным"""
+        if 'title' in update_data:
+            order.title = update_data['title']
+        if 'address' in update_data:
+            order.address = update_data.get('address')
+        if 'date' in update_data:
+            order.date = update_data['date']
+        if 'client_id' in update_data:
+            order.client_id = update_data.get('client_id')
+
+        if products_data is not None:
+            OrderService._sync_order_products(order, products_data)
+            OrderService._recalculate_order_totals(order)
+
+        # Изменение только строк заказа не затрагивает колонки orders - onupdate не сработает
+        order.updated_at = datetime.utcnow()
+
     @staticmethod
     def create_order(user_id, order_data):
         try:
@@ -60,26 +252,15 @@ class OrderService:
                 order_data.get('products', [])
             )
 
-            # Создание заказа
-            order = Order(
-                user_id=user_id,
-                title=order_data['title'],
-                address=order_data.get('address'),
-                date=order_data['date'],
-                client_id=order_data.get('client_id')
-            )
-
-            # Добавление продуктов
-            for op_data in products_data:
-                order.products.append(OrderProduct(**op_data))
-
+            order = OrderService._new_order(user_id, order_data, products_data)
             db.session.add(order)
+            ChangeService.bump(user_id, ChangeService.ORDER)
             db.session.commit()
-            return OrderSchema().dump(order), None
+            return dump(OrderSchema, order), None
 
         except ValueError as e:
             return None, {'error': str(e)}
-        except IntegrityError as e:
+        except IntegrityError:
             db.session.rollback()
             return None, {'error': 'Database error'}
         except Exception as e:
@@ -96,42 +277,183 @@ class OrderService:
             if 'client_id' in update_data:
                 OrderService._validate_client(user_id, update_data.get('client_id'))
 
-            # Обновление основных полей
-            if 'title' in update_data:
-                order.title = update_data['title']
-            if 'address' in update_data:
-                order.address = update_data.get('address')
-            if 'date' in update_data:
-                order.date = update_data['date']
+            # Валидируем новые продукты до удаления старых
+            products_data = None
+            if 'products' in update_data:
+                products_data = OrderService._validate_products(
+                    user_id,
+                    update_data.get('products', [])
+                )
+
+            OrderService._apply_order_update(order, update_data, products_data)
+            ChangeService.bump(user_id, ChangeService.ORDER)
+            db.session.commit()
+            return dump(OrderSchema, order), None
+
+        except ValueError as e:
+            db.session.rollback()
+            return None, {'error': str(e)}
+        except IntegrityError:
+            db.session.rollback()
+            return None, {'error': 'Database error'}
+        except Exception as e:
+            db.session.rollback()
+            return None, {'error': str(e)}
+
+    @staticmethod
+    async def create_order_async(session, user_id, order_data):
+        """create_order через AsyncSession: ожидание блокировок SQLite не занимает поток"""
+        try:
+            await OrderService._validate_client_async(session, user_id, order_data.get('client_id'))
+            products_data = await OrderService._validate_products_async(
+                session,
+                user_id,
+                order_data.get('products', [])
+            )
+
+            order = OrderService._new_order(user_id, order_data, products_data)
+            session.add(order)
+            await ChangeService.bump_async(session, user_id, ChangeService.ORDER)
+            await session.commit()
+            return dump(OrderSchema, order), None
+
+        except ValueError as e:
+            await session.rollback()
+            return None, {'error': str(e)}
+        except IntegrityError:
+            await session.rollback()
+            return None, {'error': 'Database error'}
+        except Exception:
+            await session.rollback()
+            logger.exception('Order write failed')
+            return None, {'error': 'Internal error'}
+
+    @staticmethod
+    async def update_order_async(session, user_id, order, update_data):
+        """update_order через AsyncSession; строки заказа должны быть загружены (selectinload)"""
+        try:
+            if not order or order.user_id != user_id:
+                return None, {'error': 'Order not found'}
+
             if 'client_id' in update_data:
-                order.client_id = update_data.get('client_id')
+                await OrderService._validate_client_async(session, user_id, update_data.get('client_id'))
 
-            # Обновление продуктов
+            products_data = None
             if 'products' in update_data:
-                # Удаляем старые продукты
-                OrderProduct.query.filter_by(order_id=order.id).delete()
-
-                # Добавляем новые с валидацией
-                products_data = OrderService._validate_products(
+                products_data = await OrderService._validate_products_async(
+                    session,
                     user_id,
                     update_data.get('products', [])
                 )
 
-                for op_data in products_data:
-                    order.products.append(OrderProduct(**op_data))
+            OrderService._apply_order_update(order, update_data, products_data)
+            await ChangeService.bump_async(session, user_id, ChangeService.ORDER)
+            await session.commit()
+            return dump(OrderSchema, order), None
+
+        except ValueError as e:
+            await session.rollback()
+            return None, {'error': str(e)}
+        except IntegrityError:
+            await session.rollback()
+            return None, {'error': 'Database error'}
+        except Exception:
+            await session.rollback()
+            logger.exception('Order write failed')
+            return None, {'error': 'Internal error'}
+
+    @staticmethod
+    def patch_order_products(user_id, order, patch_data):
+        """Точечное добавление/изменение и удаление строк заказа"""
+        try:
+            if not order or order.user_id != user_id:
+                return None, {'error': 'Order not found'}
+
+            to_add = patch_data.get('add', [])
+            to_remove = set(patch_data.get('remove', []))
+            if not to_add and not to_remove:
+                return None, {'error': 'No changes provided'}
+            OrderService._unique_lines(to_add)
+
+            conflicting = to_remove & {item['product_id'] for item in to_add}
+            if conflicting:
+                ids = ', '.join(str(pid) for pid in sorted(conflicting))
+                return None, {'error': f"Products {ids} are both added and removed"}
+
+            existing = {line.product_id: line for line in order.products}
+            absent = to_remove - existing.keys()
+            if absent:
+                ids = ', '.join(str(pid) for pid in sorted(absent))
+                return None, {'error': f"Products {ids} not in order"}
+
+            products_data = OrderService._validate_products(user_id, to_add)
+
+            for product_id in to_remove:
+                order.products.remove(existing.pop(product_id))
+
+            OrderService._upsert_order_products(order, products_data, existing)
+            OrderService._recalculate_order_totals(order)
+            order.updated_at = datetime.utcnow()
 
+            ChangeService.bump(user_id, ChangeService.ORDER)
             db.session.commit()
-            return OrderSchema().dump(order), None
+            return dump(OrderSchema, order), None
 
         except ValueError as e:
+            db.session.rollback()
             return None, {'error': str(e)}
-        except IntegrityError as e:
+        except IntegrityError:
             db.session.rollback()
             return None, {'error': 'Database error'}
         except Exception as e:
             db.session.rollback()
             return None, {'error': str(e)}
 
+    @staticmethod
+    def get_stats(user_id, date_from=None, date_to=None):
+        """Выручка по дням, клиентам и продуктам; агрегация в SQL, без загрузки ORM-объектов"""
+        filters = [Order.user_id == user_id]
+        if date_from is not None:
+            filters.append(Order.date >= date_from)
+        if date_to is not None:
+            filters.append(Order.date < date_to)
+
+        day = func.date(Order.date).label('day')
+        by_day = db.session.execute(
+            select(
+                day,
+                func.count(Order.id).label('orders'),
+                func.sum(Order.item_count).label('items'),
+                func.sum(Order.total).label('revenue')
+            ).where(*filters).group_by(day).order_by(day)
+        ).mappings().all()
+
+        by_client = db.session.execute(
+            select(
+                Order.client_id,
+                func.count(Order.id).label('orders'),
+                func.sum(Order.item_count).label('items'),
+                func.sum(Order.total).label('revenue')
+            ).where(*filters).group_by(Order.client_id).order_by(func.sum(Order.total).desc())
+        ).mappings().all()
+
+        line_revenue = func.sum(OrderProduct.quantity * OrderProduct.price_at_order)
+        by_product = db.session.execute(
+            select(
+                OrderProduct.product_id,
+                func.count(OrderProduct.order_id).label('orders'),
+                func.sum(OrderProduct.quantity).label('items'),
+                line_revenue.label('revenue')
+            ).join(Order, Order.id == OrderProduct.order_id)
+            .where(*filters).group_by(OrderProduct.product_id).order_by(line_revenue.desc())
+        ).mappings().all()
+
+        return {
+            'by_day': [dict(row) for row in by_day],
+            'by_client': [dict(row) for row in by_client],
+            'by_product': [dict(row) for row in by_product],
+        }, None
+
     @staticmethod
     def delete_order(order):
         if not order:
@@ -139,6 +461,8 @@ class OrderService:
 
         try:
             db.session.delete(order)
+            SyncService.record_deletion(order.user_id, ChangeService.ORDER, order.id)
+            ChangeService.bump(order.user_id, ChangeService.ORDER)
             db.session.commit()
             return {'message': 'Order deleted'}, 200
         except Exception as e:
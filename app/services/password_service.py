@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь хеширования паролей заполнена"""
+
+
+class _BoundedExecutor:
+    """Пул потоков с ограниченной очередью: при переполнении задача отклоняется, а не копится"""
+
+    def __init__(self, max_workers, max_queue):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = _BoundedExecutor(
+                    current_app.config['PASSWORD_HASH_WORKERS'],
+                    current_app.config['PASSWORD_HASH_QUEUE']
+                )
+    return _executor
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    """Метод KDF в том виде, в каком werkzeug пишет его в хеш ('scrypt' -> 'scrypt:32768:8:1')"""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+class PasswordService:
+    @staticmethod
+    def hash_password(password):
+        method = current_app.config['PASSWORD_HASH_METHOD']
+        return _get_executor().run(generate_password_hash, password, method)
+
+    @staticmethod
+    def check_password(password_hash, password):
+        return _get_executor().run(check_password_hash, password_hash, password)
+
+    @staticmethod
+    def needs_rehash(password_hash):
+        """Хеш посчитан с другими параметрами KDF, чем заданы в конфиге"""
+        return password_hash.split('$', 1)[0] != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
@@ -0,0 +1,324 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from werkzeug.security import safe_join
+
+from app.extensions import db
+from app.product.models import Photo, Product
+from app.services.change_service import ChangeService
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow не установлен - варианты не строятся, отдаём оригиналы
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Отдельный пул, чтобы ресайз не выполнялся в потоке обработки запроса
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='photo-variants')
+
+# Имя фото в хранилище - sha256 содержимого; старые фото называются <timestamp>_<uuid>.<ext>
+_CONTENT_NAME_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+_SHARD_RE = re.compile(r'^[0-9a-f]{2}$')
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Сигнатуры начала файла: тип определяется по содержимому, а не только по расширению
+_SIGNATURES = {
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+}
+
+
+class PhotoService:
+    ORIGINAL = 'original'
+
+    @staticmethod
+    def is_content_addressed(filename):
+        return bool(_CONTENT_NAME_RE.match(filename))
+
+    @staticmethod
+    def relative_path(filename):
+        """Путь относительно UPLOAD_FOLDER: ab/cd/<sha256>.<ext> для новых фото, плоский для старых"""
+        if PhotoService.is_content_addressed(filename):
+            return os.path.join(filename[:2], filename[2:4], filename)
+        return filename
+
+    @staticmethod
+    def _check_signature(chunk, ext):
+        if not any(chunk.startswith(signature) for signature in _SIGNATURES.get(ext, ())):
+            raise ValueError('File content does not match its type')
+
+    @staticmethod
+    def store(stream, ext, max_size=None):
+        """Потоковая запись загрузки с подсчётом sha256; одинаковое содержимое хранится одним файлом.
+
+        Тип проверяется по первому блоку, размер - по мере чтения, так что поддельный
+        или слишком большой файл отклоняется (ValueError) без записи целиком.
+        """
+        first = stream.read(HASH_CHUNK_SIZE)
+        PhotoService._check_signature(first, ext)
+
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        tmp_dir = os.path.join(upload_folder, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid4().hex)
+
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                chunk = first
+                while chunk:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise ValueError('File too large')
+                    digest.update(chunk)
+                    out.write(chunk)
+                    chunk = stream.read(HASH_CHUNK_SIZE)
+
+            filename = f"{digest.hexdigest()}.{ext}"
+            target = os.path.join(upload_folder, PhotoService.relative_path(filename))
+            if os.path.exists(target):
+                os.remove(tmp_path)
+                # Свежий mtime защищает файл от sweep_orphans, пока ссылка на него не закоммичена
+                os.utime(target)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp_path, target)
+            return filename
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def add_reference(filename, count=1):
+        """Учёт ссылки продукта на файл в текущей транзакции"""
+        updated = Photo.query.filter_by(filename=filename).update(
+            {Photo.ref_count: Photo.ref_count + count}
+        )
+        if not updated:
+            db.session.add(Photo(filename=filename, ref_count=count))
+
+    @staticmethod
+    def release_reference(filename):
+        """Снятие ссылки; True - ссылок не осталось и файл можно удалить после коммита"""
+        updated = Photo.query.filter_by(filename=filename).update(
+            {Photo.ref_count: Photo.ref_count - 1}
+        )
+        if not updated:
+            # Старые фото без учёта ссылок принадлежат одному продукту
+            return True
+        deleted = db.session.execute(
+            delete(Photo).where(Photo.filename == filename, Photo.ref_count <= 0)
+        )
+        return deleted.rowcount > 0
+
+    @staticmethod
+    def release_user_references(user_id):
+        """Снятие ссылок всех продуктов пользователя одним UPDATE (перед удалением пользователя).
+
+        Файлы, оставшиеся без ссылок, удаляет sweep-photos.
+        Возвращает старые фото продуктов пользователя - они без учёта ссылок.
+        """
+        photos = (
+            select(Product.photo, func.count().label('count'))
+            .where(Product.user_id == user_id, Product.photo.is_not(None))
+            .group_by(Product.photo)
+            .subquery()
+        )
+        db.session.execute(
+            update(Photo)
+            .where(Photo.filename == photos.c.photo)
+            .values(ref_count=Photo.ref_count - photos.c.count)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(delete(Photo).where(Photo.ref_count <= 0))
+        filenames = db.session.scalars(
+            select(Product.photo).distinct().where(Product.user_id == user_id, Product.photo.is_not(None))
+        )
+        return [filename for filename in filenames if not PhotoService.is_content_addressed(filename)]
+
+    @staticmethod
+    def is_referenced(filename):
+        return db.session.scalar(select(Photo.filename).where(Photo.filename == filename)) is not None
+
+    @staticmethod
+    def _is_stale(path, grace_seconds):
+        try:
+            return os.stat(path).st_mtime < time.time() - grace_seconds
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _stored_files(upload_folder):
+        """Пути файлов контентно-адресуемого хранилища (ab/cd/<sha256>.<ext>)"""
+        for first in os.listdir(upload_folder):
+            if not _SHARD_RE.match(first):
+                continue
+            for second in os.listdir(os.path.join(upload_folder, first)):
+                shard = os.path.join(upload_folder, first, second)
+                if not _SHARD_RE.match(second) or not os.path.isdir(shard):
+                    continue
+                for name in os.listdir(shard):
+                    if _CONTENT_NAME_RE.match(name):
+                        yield os.path.join(shard, name)
+
+    @staticmethod
+    def sweep_orphans(grace_seconds):
+        """Удаление файлов хранилища без ссылок, не изменявшихся дольше grace_seconds.
+
+        Файл по хэшу может быть общим, а параллельная загрузка того же содержимого может
+        вот-вот на него сослаться, поэтому запросы файлы не удаляют - только эта уборка.
+        store() обновляет mtime существующего файла, так что такой файл моложе порога.
+        """
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        removed = 0
+        for path in PhotoService._stored_files(upload_folder):
+            if not PhotoService._is_stale(path, grace_seconds):
+                continue
+            filename = os.path.basename(path)
+            referenced = PhotoService.is_referenced(filename)
+            # Завершаем транзакцию чтения, иначе следующие проверки увидят старый снимок БД
+            db.session.rollback()
+            # Повторная проверка возраста: загрузка могла коснуться файла, пока шёл запрос к БД
+            if referenced or not PhotoService._is_stale(path, grace_seconds):
+                continue
+            os.remove(path)
+            PhotoService.delete_variants(filename)
+            removed += 1
+
+        # Временные файлы прерванных загрузок
+        tmp_dir = os.path.join(upload_folder, 'tmp')
+        if os.path.isdir(tmp_dir):
+            for name in os.listdir(tmp_dir):
+                path = os.path.join(tmp_dir, name)
+                if PhotoService._is_stale(path, grace_seconds):
+                    os.remove(path)
+        return removed
+
+    @staticmethod
+    def migrate_legacy():
+        """Перенос фото из плоской папки в контентно-адресуемое хранилище"""
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        legacy = db.session.execute(
+            select(Product.photo, func.count()).where(Product.photo.isnot(None)).group_by(Product.photo)
+        ).all()
+
+        migrated = 0
+        for filename, count in legacy:
+            if PhotoService.is_content_addressed(filename):
+                continue
+            path = safe_join(upload_folder, filename)
+            if path is None or not os.path.isfile(path):
+                continue
+
+            with open(path, 'rb') as source:
+                try:
+                    new_filename = PhotoService.store(source, filename.rsplit('.', 1)[-1].lower())
+                except ValueError as e:
+                    current_app.logger.warning(f"Skipping photo {filename}: {e}")
+                    continue
+            user_ids = db.session.scalars(
+                select(Product.user_id).where(Product.photo == filename).distinct()
+            ).all()
+            Product.query.filter_by(photo=filename).update({Product.photo: new_filename},
+                                                           synchronize_session=False)
+            PhotoService.add_reference(new_filename, count)
+            for user_id in user_ids:
+                ChangeService.bump(user_id, ChangeService.PRODUCT)
+            db.session.commit()
+
+            os.remove(path)
+            PhotoService.delete_variants(filename)
+            migrated += 1
+        return migrated
+
+    @staticmethod
+    def _build_variant(upload_folder, filename, size, max_side):
+        """Построение одного уменьшенного варианта; повторный вызов берёт его из дискового кэша"""
+        relative_path = PhotoService.relative_path(filename)
+        source = safe_join(upload_folder, relative_path)
+        target = safe_join(upload_folder, size, relative_path)
+        if source is None or target is None:
+            return None
+        if os.path.exists(target):
+            return target
+        if Image is None or not os.path.isfile(source):
+            return None
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Пишем во временный файл и переименовываем, чтобы не отдать недописанный вариант
+        tmp_path = f"{target}.{uuid4().hex}.tmp"
+        try:
+            with Image.open(source) as image:
+                image_format = image.format
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((max_side, max_side))
+                if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                image.save(tmp_path, format=image_format)
+            os.replace(tmp_path, target)
+            return target
+        except Exception as e:
+            logger.error(f"Error building {size} variant of {filename}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    @staticmethod
+    def _build_variants(upload_folder, filename, variants):
+        for size, max_side in variants.items():
+            PhotoService._build_variant(upload_folder, filename, size, max_side)
+
+    @staticmethod
+    def schedule_variants(filename):
+        """Фоновая генерация всех вариантов только что загруженного фото"""
+        if Image is None:
+            return None
+        return _executor.submit(
+            PhotoService._build_variants,
+            current_app.config['UPLOAD_FOLDER'],
+            filename,
+            dict(current_app.config['PHOTO_VARIANTS'])
+        )
+
+    @staticmethod
+    def get_variant(filename, size):
+        """Каталог, имя файла для отдачи варианта size и признак, что это именно он.
+
+        Для фото, загруженных до появления вариантов, вариант строится при первом запросе
+        и сохраняется на диск. Если построить его нельзя, отдаётся оригинал (признак False).
+        """
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        relative_path = PhotoService.relative_path(filename)
+        if size == PhotoService.ORIGINAL:
+            return upload_folder, relative_path, True
+
+        variants = current_app.config['PHOTO_VARIANTS']
+        if size not in variants:
+            raise ValueError(f"Unknown size '{size}'")
+
+        if PhotoService._build_variant(upload_folder, filename, size, variants[size]) is None:
+            return upload_folder, relative_path, False
+        return os.path.join(upload_folder, size), relative_path, True
+
+    @staticmethod
+    def delete_variants(filename):
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        for size in current_app.config['PHOTO_VARIANTS']:
+            try:
+                path = safe_join(upload_folder, size, PhotoService.relative_path(filename))
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                current_app.logger.error(f"Error deleting {size} variant of {filename}: {str(e)}")
@@ -1,15 +1,23 @@
 import os
-from datetime import datetime
-from uuid import uuid4
 
-from werkzeug.utils import secure_filename
-from flask import current_app
+from flask import current_app, has_app_context
 
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 from app.extensions import db
+from app.order.models import OrderProduct
+from app.pagination import paginate
 from app.product.models import Product
 from app.product.schemas import ProductSchema
+from app.serializers import dump
+from app.services.cache_service import CacheService
+from app.services.change_service import ChangeService
+from app.services.order_service import OrderService
+from app.services.photo_service import PhotoService
+from app.services.search_service import SearchService
+from app.services.sync_service import SyncService
 
 
 class ProductService:
@@ -22,10 +30,7 @@ class ProductService:
     def create_product(user_id, product_data, photo_file=None):
         photo_filename = None
         try:
-
-            # Проверка уникальности имени
-            if Product.query.filter_by(user_id=user_id, title=product_data['title']).first():
-                return None, {'title': 'Product`s title already exists for this user'}
+            # Уникальность названия проверяет ограничение _user_product_uc (IntegrityError ниже)
 
             # Обработка фото
             if photo_file:
@@ -44,22 +49,58 @@ class ProductService:
             )
 
             db.session.add(new_product)
+            db.session.flush()
+            if photo_filename:
+                PhotoService.add_reference(photo_filename)
+            SearchService.index_product(new_product)
+            ChangeService.bump(user_id, ChangeService.PRODUCT)
             db.session.commit()
 
-            return ProductSchema().dump(new_product), None
+            return dump(ProductSchema, new_product), None
 
         except IntegrityError:
             # Удаляем сохраненный файл при ошибке
+            db.session.rollback()
             if photo_filename:
                 ProductService.delete_photo(photo_filename)
-            db.session.rollback()
             return None, {'title': 'Product`s title already exists for this user'}
         except Exception as e:
+            db.session.rollback()
             if photo_filename:
                 ProductService.delete_photo(photo_filename)
-            db.session.rollback()
             return None, {'error': str(e)}
 
+    @staticmethod
+    def get_products(user_id, limit, after=None):
+        return CacheService.get_or_load(
+            user_id, ChangeService.PRODUCT, f'page:{limit}:{after}',
+            lambda: ProductService._load_products(user_id, limit, after)
+        )
+
+    @staticmethod
+    def _load_products(user_id, limit, after):
+        query = Product.query.filter_by(user_id=user_id)
+        if after is not None:
+            try:
+                (last_id,) = after
+                last_id = int(last_id)
+            except (TypeError, ValueError):
+                return None, {'error': 'Invalid cursor'}
+            query = query.filter(Product.id > last_id)
+
+        products, next_cursor = paginate(query.order_by(Product.id), limit, lambda p: [p.id])
+        return {'items': dump(ProductSchema, products, many=True), 'next': next_cursor}, None
+
+    @staticmethod
+    def search_products(user_id, query, limit, after=None):
+        if not SearchService.enabled():
+            return None, {'error': 'Search is not available'}
+        try:
+            products, next_cursor = SearchService.search_products(user_id, query, limit, after)
+        except ValueError as e:
+            return None, {'error': str(e)}
+        return {'items': dump(ProductSchema, products, many=True), 'next': next_cursor}, None
+
     @staticmethod
     def save_photo(file):
         if not file or file.filename == '':
@@ -68,16 +109,12 @@ class ProductService:
         if not ProductService._allowed_file(file.filename):
             return None, 'File type not allowed'
 
-        if file.content_length > current_app.config['MAX_FILE_SIZE']:
-            return None, 'File too large'
-
-        # Генерируем уникальное имя файла
+        # Имя файла - хэш содержимого, одинаковые фото хранятся один раз
         ext = file.filename.rsplit('.', 1)[1].lower()
-        unique_name = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid4().hex}.{ext}"
-        filename = secure_filename(unique_name)
 
         try:
-            file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+            filename = PhotoService.store(file.stream, ext, current_app.config['MAX_FILE_SIZE'])
+            PhotoService.schedule_variants(filename)
             return filename, None
         except Exception as e:
             return None, str(e)
@@ -86,13 +123,27 @@ class ProductService:
     def delete_photo(filename):
         if not filename:
             return
+        # Файл по хэшу может быть общим, и на него может как раз ссылаться параллельная
+        # загрузка: файлы без ссылок удаляет команда sweep-photos, а не запрос
+        if PhotoService.is_content_addressed(filename):
+            return
         try:
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+            path = os.path.join(current_app.config['UPLOAD_FOLDER'], PhotoService.relative_path(filename))
             if os.path.exists(path):
                 os.remove(path)
+            PhotoService.delete_variants(filename)
         except Exception as e:
             current_app.logger.error(f"Error deleting file {filename}: {str(e)}")
 
+    @staticmethod
+    def delete_photo_on_commit(filename):
+        """delete_photo после коммита текущей транзакции; при откате файл остаётся"""
+        if not filename:
+            return
+        session = db.session()
+        savepoint = session.get_nested_transaction()
+        session.info.setdefault('photo_deletions', []).append((savepoint, filename))
+
     @staticmethod
     def update_product(product, update_data, photo_file=None):
         new_photo = None
@@ -114,17 +165,7 @@ class ProductService:
                 new_photo = filename
                 update_data['photo'] = new_photo
 
-            # Проверка уникальности имени
-            if 'title' in update_data:
-                existing = Product.query.filter(
-                    Product.user_id == product.user_id,
-                    Product.title == update_data['title'],
-                    Product.id != product.id
-                ).first()
-                if existing:
-                    if new_photo:
-                        ProductService.delete_photo(new_photo)
-                    return None, {'title': 'Product title already exists for this user'}
+            # Уникальность названия проверяет ограничение _user_product_uc (IntegrityError ниже)
 
             # Обновление полей, при этом если данных нет, сохраняем старые значения
             for key, value in update_data.items():
@@ -136,24 +177,34 @@ class ProductService:
                 if key not in update_data:
                     setattr(product, key, getattr(product, key))  # сохраняем старое значение
 
+            # Переносим ссылку на файл со старого фото на новое
+            release_old_photo = False
+            if product.photo != old_photo:
+                if product.photo:
+                    PhotoService.add_reference(product.photo)
+                if old_photo:
+                    release_old_photo = PhotoService.release_reference(old_photo)
+
+            # Старая фотография удаляется после успешного коммита
+            if release_old_photo:
+                ProductService.delete_photo_on_commit(old_photo)
+
             # Коммитим изменения в БД
+            SearchService.index_product(product)
+            ChangeService.bump(product.user_id, ChangeService.PRODUCT)
             db.session.commit()
 
-            # Удаляем старую фотографию после успешного обновления
-            if new_photo and old_photo:
-                ProductService.delete_photo(old_photo)
-
-            return ProductSchema().dump(product), None
+            return dump(ProductSchema, product), None
 
         except IntegrityError:
+            db.session.rollback()
             if new_photo:
                 ProductService.delete_photo(new_photo)
-            db.session.rollback()
-            return None, {'title': 'Product`s title already exists for this user'}
+            return None, {'title': 'Product title already exists for this user'}
         except Exception as e:
+            db.session.rollback()
             if new_photo:
                 ProductService.delete_photo(new_photo)
-            db.session.rollback()
             return None, {'error': str(e)}
 
     @staticmethod
@@ -164,12 +215,45 @@ class ProductService:
 
         photo_to_delete = product.photo
         try:
+            # Строки заказов удаляем явно, чтобы пересчитать суммы затронутых заказов
+            order_ids = db.session.scalars(
+                db.select(OrderProduct.order_id).where(OrderProduct.product_id == product.id)
+            ).all()
+            OrderProduct.query.filter_by(product_id=product.id).delete(synchronize_session=False)
+            OrderService.recalculate_totals(order_ids, touch=True)
+
+            # Файл удаляется после успешного удаления из БД
+            if photo_to_delete and PhotoService.release_reference(photo_to_delete):
+                ProductService.delete_photo_on_commit(photo_to_delete)
             db.session.delete(product)
+            SearchService.remove_product(product.id)
+            SyncService.record_deletion(product.user_id, ChangeService.PRODUCT, product.id)
+            # Строки заказов с этим продуктом удаляются каскадом - меняется и список заказов
+            ChangeService.bump(product.user_id, ChangeService.PRODUCT, ChangeService.ORDER)
             db.session.commit()
-            # Удаляем файл после успешного удаления из БД
-            if photo_to_delete:
-                ProductService.delete_photo(photo_to_delete)
             return {'message': 'Product deleted'}, 200
         except Exception as e:
             db.session.rollback()
-            return {'error': str(e)}, 500
\ No newline at end of file
+            return {'error': str(e)}, 500
+
+
+@event.listens_for(Session, 'after_commit')
+def _delete_photos_after_commit(session):
+    # RELEASE SAVEPOINT (атомарный /api/batch) - ещё не коммит
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop('photo_deletions', None)
+    if pending and has_app_context():
+        for _, filename in pending:
+            ProductService.delete_photo(filename)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _keep_photos_after_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('photo_deletions', None)
+        return
+    # Откат точки сохранения отменяет только удаления, запланированные внутри неё
+    pending = session.info.get('photo_deletions')
+    if pending:
+        pending[:] = [entry for entry in pending if entry[0] is not previous_transaction]
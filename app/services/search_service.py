@@ -0,0 +1,171 @@
+import re
+
+from sqlalchemy import inspect, text
+
+from app.client.models import Client
+from app.extensions import db
+from app.pagination import encode_cursor
+from app.product.models import Product
+
+# Полнотекстовые индексы SQLite FTS5: rowid совпадает с id исходной строки,
+# user_id хранится неиндексируемой колонкой для фильтрации по владельцу
+SEARCH_TABLES = {
+    'products_fts': "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts "
+                    "USING fts5(title, description, user_id UNINDEXED)",
+    'clients_fts': "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts "
+                   "USING fts5(first_name, last_name, phone, user_id UNINDEXED)",
+}
+
+# Заполнение индексов по исходным таблицам (rebuild и только что созданные таблицы)
+SEARCH_SOURCES = {
+    'products_fts': "INSERT INTO products_fts(rowid, title, description, user_id) "
+                    "SELECT id, title, description, user_id FROM products",
+    'clients_fts': "INSERT INTO clients_fts(rowid, first_name, last_name, phone, user_id) "
+                   "SELECT id, first_name, last_name, phone, user_id FROM clients",
+}
+
+# Веса колонок для bm25: совпадение в названии/имени важнее, чем в описании/телефоне
+SEARCH_RANK = {
+    'products_fts': 'bm25(products_fts, 10.0, 1.0, 0.0)',
+    'clients_fts': 'bm25(clients_fts, 5.0, 5.0, 1.0, 0.0)',
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchService:
+    @staticmethod
+    def enabled():
+        return db.engine.dialect.name == 'sqlite'
+
+    @staticmethod
+    def ensure_tables():
+        """Создание индексов; созданный на существующей БД индекс сразу заполняется её строками.
+
+        Возвращает имена созданных таблиц.
+        """
+        if not SearchService.enabled():
+            return []
+        created = []
+        with db.engine.begin() as connection:
+            existing = set(inspect(connection).get_table_names())
+            for name, ddl in SEARCH_TABLES.items():
+                connection.execute(text(ddl))
+                if name not in existing:
+                    # Строки, уже проиндексированные параллельно стартующим процессом, пропускаем
+                    connection.execute(text(f"{SEARCH_SOURCES[name]} WHERE id NOT IN (SELECT rowid FROM {name})"))
+                    created.append(name)
+        return created
+
+    @staticmethod
+    def rebuild():
+        """Полное перестроение индексов по таблицам products и clients"""
+        if not SearchService.enabled():
+            return 0, 0
+        SearchService.ensure_tables()
+        for name, source in SEARCH_SOURCES.items():
+            db.session.execute(text(f"DELETE FROM {name}"))
+            db.session.execute(text(source))
+        db.session.commit()
+        return Product.query.count(), Client.query.count()
+
+    # Синхронизация выполняется в транзакции вызывающего сервиса, коммит делает он
+
+    @staticmethod
+    def index_product(product):
+        if not SearchService.enabled():
+            return
+        db.session.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {'id': product.id})
+        db.session.execute(
+            text("INSERT INTO products_fts(rowid, title, description, user_id) "
+                 "VALUES (:id, :title, :description, :user_id)"),
+            {'id': product.id, 'title': product.title,
+             'description': product.description, 'user_id': product.user_id}
+        )
+
+    @staticmethod
+    def index_products(rows):
+        """Индексация пачки новых продуктов (словари с id) одним executemany"""
+        if SearchService.enabled() and rows:
+            db.session.execute(
+                text("INSERT INTO products_fts(rowid, title, description, user_id) "
+                     "VALUES (:id, :title, :description, :user_id)"),
+                rows
+            )
+
+    @staticmethod
+    def remove_product(product_id):
+        if SearchService.enabled():
+            db.session.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {'id': product_id})
+
+    @staticmethod
+    def index_client(client):
+        if not SearchService.enabled():
+            return
+        db.session.execute(text("DELETE FROM clients_fts WHERE rowid = :id"), {'id': client.id})
+        db.session.execute(
+            text("INSERT INTO clients_fts(rowid, first_name, last_name, phone, user_id) "
+                 "VALUES (:id, :first_name, :last_name, :phone, :user_id)"),
+            {'id': client.id, 'first_name': client.first_name, 'last_name': client.last_name,
+             'phone': client.phone, 'user_id': client.user_id}
+        )
+
+    @staticmethod
+    def index_clients(rows):
+        """Индексация пачки новых клиентов (словари с id) одним executemany"""
+        if SearchService.enabled() and rows:
+            db.session.execute(
+                text("INSERT INTO clients_fts(rowid, first_name, last_name, phone, user_id) "
+                     "VALUES (:id, :first_name, :last_name, :phone, :user_id)"),
+                rows
+            )
+
+    @staticmethod
+    def remove_client(client_id):
+        if SearchService.enabled():
+            db.session.execute(text("DELETE FROM clients_fts WHERE rowid = :id"), {'id': client_id})
+
+    @staticmethod
+    def _match_expression(query):
+        """Запрос пользователя -> выражение MATCH: каждое слово как префикс, все слова обязательны"""
+        tokens = _TOKEN_RE.findall(query)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    @staticmethod
+    def _search(fts_table, model, user_id, query, limit, after):
+        match = SearchService._match_expression(query)
+        if not match:
+            return [], None
+
+        # Курсор поиска - смещение в ранжированной выдаче (ранг не годится как ключ keyset)
+        offset = 0
+        if after is not None:
+            try:
+                (offset,) = after
+                offset = int(offset)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid cursor')
+            if offset < 0:
+                raise ValueError('Invalid cursor')
+
+        ids = db.session.execute(
+            text(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :match AND user_id = :user_id "
+                 f"ORDER BY {SEARCH_RANK[fts_table]} LIMIT :limit OFFSET :offset"),
+            {'match': match, 'user_id': user_id, 'limit': limit + 1, 'offset': offset}
+        ).scalars().all()
+
+        next_cursor = None
+        if len(ids) > limit:
+            ids = ids[:limit]
+            next_cursor = encode_cursor([offset + limit])
+
+        rows = {row.id: row for row in model.query.filter(model.id.in_(ids), model.user_id == user_id)}
+        return [rows[row_id] for row_id in ids if row_id in rows], next_cursor
+
+    @staticmethod
+    def search_products(user_id, query, limit, after=None):
+        return SearchService._search('products_fts', Product, user_id, query, limit, after)
+
+    @staticmethod
+    def search_clients(user_id, query, limit, after=None):
+        return SearchService._search('clients_fts', Client, user_id, query, limit, after)
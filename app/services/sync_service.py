@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from app.client.models import Client
+from app.client.schemas import ClientSchema
+from app.extensions import db
+from app.order.models import Order
+from app.order.schemas import OrderSchema
+from app.pagination import encode_cursor, decode_cursor
+from app.product.models import Product
+from app.product.schemas import ProductSchema
+from app.serializers import dump
+from app.sync.models import Tombstone
+
+
+class SyncService:
+    @staticmethod
+    def record_deletion(user_id, resource, resource_id):
+        """Запись tombstone в транзакции удаления (коммит делает вызывающий сервис)"""
+        db.session.add(Tombstone(user_id=user_id, resource=resource, resource_id=resource_id))
+
+    @staticmethod
+    def _decode_token(token):
+        try:
+            (since,) = decode_cursor(token)
+            return datetime.fromisoformat(since)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid sync token')
+
+    @staticmethod
+    def get_changes(user_id, token=None):
+        """Строки, изменённые или удалённые с момента выдачи token (без token - полный снимок)"""
+        since = None
+        if token:
+            try:
+                since = SyncService._decode_token(token)
+            except ValueError as e:
+                return None, {'error': str(e)}
+
+        # Момент фиксируется до выборок. Новый токен сдвинут назад на SYNC_CLOCK_SKEW, чтобы
+        # не потерять записи из транзакций, закоммиченных позже начала этой синхронизации;
+        # повторно пришедшие строки клиент просто перезаписывает по id
+        started_at = datetime.utcnow()
+        next_token = encode_cursor([
+            (started_at - timedelta(seconds=current_app.config['SYNC_CLOCK_SKEW'])).isoformat()
+        ])
+
+        products = Product.query.filter(Product.user_id == user_id)
+        clients = Client.query.filter(Client.user_id == user_id)
+        orders = Order.query.options(selectinload(Order.products)).filter(Order.user_id == user_id)
+        deleted = {'product': [], 'client': [], 'order': []}
+
+        if since is not None:
+            products = products.filter(Product.updated_at >= since)
+            clients = clients.filter(Client.updated_at >= since)
+            orders = orders.filter(Order.updated_at >= since)
+            tombstones = db.session.execute(
+                db.select(Tombstone.resource, Tombstone.resource_id)
+                .where(Tombstone.user_id == user_id, Tombstone.deleted_at >= since)
+                .order_by(Tombstone.id)
+            )
+            for resource, resource_id in tombstones:
+                deleted.setdefault(resource, []).append(resource_id)
+
+        changes = {
+            'products': dump(ProductSchema, products.order_by(Product.id), many=True),
+            'clients': dump(ClientSchema, clients.order_by(Client.id), many=True),
+            'orders': dump(OrderSchema, orders.order_by(Order.id), many=True),
+        }
+        # В таблицах без AUTOINCREMENT (БД, созданные до него) SQLite может выдать id удалённой
+        # строки заново. Строка в ответе - текущее состояние, поэтому её tombstone отбрасывается
+        for resource, key in (('product', 'products'), ('client', 'clients'), ('order', 'orders')):
+            present = {row['id'] for row in changes[key]}
+            deleted[resource] = [resource_id for resource_id in deleted[resource] if resource_id not in present]
+
+        return {**changes, 'deleted': deleted, 'next': next_token}, None
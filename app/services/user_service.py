@@ -1,28 +1,34 @@
+from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db
+from app.services.cache_service import CacheService
+from app.services.change_service import ChangeService
+from app.sync.models import Tombstone
 from app.user.models import User
-from app.user.schemas import UserSchema
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.user.schemas import user_schema
+from app.services.password_service import PasswordService, PasswordHasherBusy
+from app.services.photo_service import PhotoService
+from app.services.product_service import ProductService
 
 
 class UserService:
     @staticmethod
     def create_user(user_data):
-        schema = UserSchema()
-        errors = schema.validate(user_data)
-        if errors:
-            return None, errors
-
-        # Проверка уникальности email и телефона
-        if User.query.filter_by(email=user_data['email']).first():
+        """user_data - результат user_schema.load в маршруте"""
+        # Проверка уникальности email и телефона одним запросом
+        existing = User.query.filter(
+            or_(User.email == user_data['email'], User.phone == user_data['phone'])
+        ).first()
+        if existing and existing.email == user_data['email']:
             return None, {'email': 'Email already registered'}
-
-        if User.query.filter_by(phone=user_data['phone']).first():
+        if existing:
             return None, {'phone': 'Phone already registered'}
 
+        # PasswordHasherBusy пробрасывается в маршрут (503)
+        hashed_password = PasswordService.hash_password(user_data['password'])
+
         try:
-            hashed_password = generate_password_hash(user_data['password'])
             new_user = User(
                 first_name=user_data['first_name'],
                 last_name=user_data['last_name'],
@@ -33,7 +39,7 @@ class UserService:
 
             db.session.add(new_user)
             db.session.commit()
-            return schema.dump(new_user), None
+            return user_schema.dump(new_user), None
 
         except IntegrityError as e:
             db.session.rollback()
@@ -45,8 +51,18 @@ class UserService:
     @staticmethod
     def authenticate(email, password):
         user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password, password):
+        if not user or not PasswordService.check_password(user.password, password):
             return None
+
+        # Параметры KDF поменялись - пересчитываем хеш, пока известен пароль
+        if PasswordService.needs_rehash(user.password):
+            try:
+                user.password = PasswordService.hash_password(password)
+                db.session.commit()
+            except PasswordHasherBusy:
+                pass
+            except Exception:
+                db.session.rollback()
         return user
 
     @staticmethod
@@ -55,6 +71,12 @@ class UserService:
         if not user:
             return {'error': 'User not found'}, 404
 
+        Tombstone.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        # Продукты удаляются каскадом - снимаем их ссылки на фото, иначе sweep-photos не удалит файлы
+        for filename in PhotoService.release_user_references(user.id):
+            ProductService.delete_photo_on_commit(filename)
+        # Освободившийся id может достаться новому пользователю - его кэш должен быть пустым
+        CacheService.invalidate(user.id, ChangeService.PRODUCT, ChangeService.CLIENT, ChangeService.ORDER)
         db.session.delete(user)
         try:
             db.session.commit()
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from app.extensions import db
+
+
+class Tombstone(db.Model):
+    """След удаления продукта, клиента или заказа для инкрементальной синхронизации"""
+    __tablename__ = 'tombstones'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    resource = db.Column(db.String(20), nullable=False)
+    resource_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_tombstones_user_id_deleted_at', 'user_id', 'deleted_at'),
+    )
@@ -0,0 +1,15 @@
+from flask import Blueprint, request, jsonify
+
+from app.auth.auth import token_required
+from app.services.sync_service import SyncService
+
+sync_bp = Blueprint('sync', __name__, url_prefix='/sync')
+
+
+@sync_bp.route('', methods=['GET'])
+@token_required
+def get_changes(user_id):
+    changes, errors = SyncService.get_changes(user_id, request.args.get('since'))
+    if errors:
+        return jsonify(errors), 400
+    return jsonify(changes), 200
@@ -14,4 +14,13 @@ class User(db.Model):
                                backref='user',
                                cascade='all, delete-orphan',
                                passive_deletes=True)
-    orders = db.relationship('Order', backref='user', lazy=True)
\ No newline at end of file
+    orders = db.relationship('Order', backref='user', lazy=True)
+    change_counters = db.relationship('ChangeCounter', cascade='all, delete-orphan')
+
+
+class ChangeCounter(db.Model):
+    """Счётчик изменений списка ресурса пользователя (основа ETag для списков)"""
+    __tablename__ = 'change_counters'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    resource = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
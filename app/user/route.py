@@ -1,28 +1,34 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
+from marshmallow import ValidationError
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from ..auth.auth import generate_jwt, decode_jwt, token_required
 
 from .models import User
-from .schemas import UserSchema
+from .schemas import user_schema
 from app.extensions import db
 from ..services.user_service import UserService
+from ..services.password_service import PasswordHasherBusy
 
 user_bp = Blueprint('user', __name__, url_prefix='/user')
-user_schema = UserSchema()
-users_schema = UserSchema(many=True)
+
+
+def _hasher_busy_response():
+    response = jsonify({"message": "Server is busy, try again later"})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(current_app.config['PASSWORD_HASH_RETRY_AFTER'])
+    return response
 
 
 @user_bp.route('/register', methods=['POST'])
 def register():
-    # Валидация входных данных
-    schema = UserSchema()
-    errors = schema.validate(request.json)
-    if errors:
-        return jsonify(errors), 400
+    # Валидация входных данных; сервис получает уже загруженные данные
+    try:
+        user_data = user_schema.load(request.json)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
 
     try:
-        user_data = request.json
         result, errors = UserService.create_user(user_data)
 
         if errors:
@@ -37,6 +43,8 @@ def register():
         }
         return jsonify(response_data), 201
 
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -44,7 +52,10 @@ def register():
 @user_bp.route('/login', methods=['POST'])
 def login():
     data = request.json
-    user = UserService.authenticate(data.get('email'), data.get('password'))
+    try:
+        user = UserService.authenticate(data.get('email'), data.get('password'))
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
 
     if not user:
         return jsonify({"message": "Invalid credentials"}), 401
@@ -52,7 +63,7 @@ def login():
     access_token = generate_jwt(user.id)
     return jsonify({
         "access_token": access_token,
-        "user": UserSchema().dump(user)
+        "user": user_schema.dump(user)
     }), 200
 
 
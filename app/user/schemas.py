@@ -11,4 +11,8 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
     last_name = ma.auto_field(required=True)
     phone = ma.auto_field(required=True)
     email = ma.Email(required=True)
-    password = ma.String(required=True, load_only=True)
\ No newline at end of file
+    password = ma.String(required=True, load_only=True)
+
+
+# Схемы не хранят состояние между вызовами - один экземпляр на процесс
+user_schema = UserSchema()
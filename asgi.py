@@ -0,0 +1,8 @@
+import os
+
+from app import create_app
+from app.asgi import AsgiApp
+from app.config import config_by_name
+
+# Запуск: uvicorn asgi:app (или любой другой ASGI-сервер)
+app = AsgiApp(create_app(config_by_name[os.getenv('APP_CONFIG', 'default')]))
@@ -0,0 +1,327 @@
+"""Нагрузочный прогон API: наполняет SQLite-базу и меряет каждый маршрут через тестовый клиент Flask.
+
+    python bench.py --users 2 --products 500 --clients 200 --orders 1000 --lines 5 --requests 50 -o bench.json
+
+Результат - JSON с p50/p95/p99 (мс), запросами в секунду и числом SQL на запрос по каждому маршруту;
+файлы разных коммитов можно сравнивать между собой. Время считается только по ответам 2xx; маршрут
+с другими ответами помечается failed, и скрипт завершается с кодом 1 (отчёт всё равно пишется).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from app import create_app
+from app.auth.auth import generate_jwt
+from app.client.models import Client
+from app.config import config_by_name
+from app.extensions import db
+from app.order.models import Order, OrderProduct
+from app.product.models import Product
+from app.services.order_service import OrderService
+from app.services.password_service import PasswordService
+from app.services.search_service import SearchService
+from app.user.models import User
+
+PASSWORD = 'bench-password'
+WORDS = ('red', 'green', 'blue', 'large', 'small', 'wooden', 'steel', 'box', 'chair', 'table', 'lamp', 'cup')
+
+
+def _png(width, height):
+    """Однотонный RGB PNG без зависимостей"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + b'\x80\x40\x20' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+PHOTO = _png(800, 600)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2, help='число арендаторов')
+    parser.add_argument('--products', type=int, default=500, help='продуктов на арендатора')
+    parser.add_argument('--clients', type=int, default=200, help='клиентов на арендатора')
+    parser.add_argument('--orders', type=int, default=1000, help='заказов на арендатора')
+    parser.add_argument('--lines', type=int, default=5, help='строк в заказе')
+    parser.add_argument('--requests', type=int, default=50, help='запросов на маршрут')
+    parser.add_argument('--config', default='default', choices=sorted(config_by_name))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', help='файл для JSON (по умолчанию stdout)')
+    return parser.parse_args()
+
+
+def seed(args, rng):
+    """Наполнение базы пачками INSERT; возвращает данные арендаторов для сценариев"""
+    password = PasswordService.hash_password(PASSWORD)
+    tenants = []
+    for n in range(args.users):
+        user = User(first_name='Bench', last_name=f'User{n}', phone=f'100{n:07d}',
+                    email=f'bench{n}@example.com', password=password)
+        db.session.add(user)
+        db.session.flush()
+
+        product_ids = db.session.scalars(insert(Product).returning(Product.id), [
+            {'user_id': user.id, 'title': f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+             'description': ' '.join(rng.choices(WORDS, k=6)), 'price': round(rng.uniform(1, 500), 2)}
+            for i in range(args.products)
+        ]).all()
+        client_ids = db.session.scalars(insert(Client).returning(Client.id), [
+            {'user_id': user.id, 'first_name': f'Client{i}', 'last_name': rng.choice(WORDS).title(),
+             'phone': f'+7{rng.randrange(10 ** 9, 10 ** 10)}'}
+            for i in range(args.clients)
+        ]).all()
+
+        start = datetime(2024, 1, 1)
+        order_ids = db.session.scalars(insert(Order).returning(Order.id), [
+            {'user_id': user.id, 'title': f'Order {i}', 'date': start + timedelta(hours=i),
+             'client_id': rng.choice(client_ids) if client_ids else None}
+            for i in range(args.orders)
+        ]).all()
+        lines = []
+        for order_id in order_ids:
+            for product_id in rng.sample(product_ids, min(args.lines, len(product_ids))):
+                lines.append({'order_id': order_id, 'product_id': product_id,
+                              'quantity': rng.randint(1, 5), 'price_at_order': round(rng.uniform(1, 500), 2)})
+        if lines:
+            db.session.execute(insert(OrderProduct), lines)
+
+        tenants.append({'id': user.id, 'token': generate_jwt(user.id), 'email': user.email,
+                        'products': product_ids, 'clients': client_ids, 'orders': order_ids})
+
+    OrderService.recalculate_totals()
+    db.session.commit()
+    if SearchService.enabled():
+        SearchService.rebuild()
+    return tenants
+
+
+class SqlCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def scenarios(client, rng):
+    """Маршруты user_bp, product_bp, client_bp и order_bp.
+
+    Каждый сценарий - (имя, функция(tenant, i) -> (метод, путь, kwargs), подготовка или None).
+    Подготовка выполняется вне замера, например создаёт объект для DELETE.
+    """
+    def auth(tenant):
+        return {'Authorization': f"Bearer {tenant['token']}"}
+
+    def created_id(tenant, path, **kwargs):
+        response = client.post(path, headers=auth(tenant), **kwargs)
+        return response.get_json()['id']
+
+    def throwaway_user(tenant, i):
+        email = f"delete-{tenant['id']}-{i}@example.com"
+        client.post('/api/user/register', json={'first_name': 'Temp', 'last_name': 'User',
+                                                'phone': f"200{tenant['id']:03d}{i:06d}",
+                                                'email': email, 'password': PASSWORD})
+        token = client.post('/api/user/login', json={'email': email, 'password': PASSWORD}).get_json()
+        return token['access_token']
+
+    def photo_name(tenant, i):
+        product = client.post('/api/product/', headers=auth(tenant), content_type='multipart/form-data',
+                              data={'title': f'photo-{i}', 'price': '1',
+                                    'photo': (io.BytesIO(PHOTO), 'photo.png')}).get_json()
+        return product['photo']
+
+    def new_order(tenant):
+        return {'title': 'Bench order', 'date': '2024-06-01T12:00:00',
+                'client_id': rng.choice(tenant['clients']) if tenant['clients'] else None,
+                'products': [{'product_id': pid, 'quantity': rng.randint(1, 5)}
+                             for pid in rng.sample(tenant['products'], min(3, len(tenant['products'])))]}
+
+    return [
+        # user_bp
+        ('POST /api/user/register', lambda t, i: ('POST', '/api/user/register', {'json': {
+            'first_name': 'New', 'last_name': 'User', 'phone': f"300{t['id']:03d}{i:06d}",
+            'email': f"new-{t['id']}-{i}@example.com", 'password': PASSWORD}}), None),
+        ('POST /api/user/login', lambda t, i: ('POST', '/api/user/login', {'json': {
+            'email': t['email'], 'password': PASSWORD}}), None),
+        ('GET /api/user/me', lambda t, i: ('GET', '/api/user/me', {'headers': auth(t)}), None),
+        ('DELETE /api/user/delete', lambda t, i, token: ('DELETE', '/api/user/delete', {
+            'headers': {'Authorization': f'Bearer {token}'}}), throwaway_user),
+
+        # product_bp
+        ('POST /api/product/', lambda t, i: ('POST', '/api/product/', {
+            'headers': auth(t), 'data': {'title': f'new-{i}', 'price': '9.99', 'description': 'bench'}}), None),
+        ('GET /api/product/', lambda t, i: ('GET', '/api/product/', {'headers': auth(t)}), None),
+        ('POST /api/product/import', lambda t, i: ('POST', '/api/product/import', {
+            'headers': auth(t), 'json': [{'title': f'import-{i}-{n}', 'price': 1.5} for n in range(50)]}), None),
+        ('GET /api/product/export', lambda t, i: ('GET', '/api/product/export', {'headers': auth(t)}), None),
+        ('GET /api/product/search', lambda t, i: ('GET', '/api/product/search', {
+            'headers': auth(t), 'query_string': {'q': rng.choice(WORDS)}}), None),
+        ('PUT /api/product/<id>', lambda t, i: ('PUT', f"/api/product/{rng.choice(t['products'])}", {
+            'headers': auth(t), 'json': {'price': round(rng.uniform(1, 500), 2)}}), None),
+        ('DELETE /api/product/<id>', lambda t, i, product_id: ('DELETE', f'/api/product/{product_id}', {
+            'headers': auth(t)}), lambda t, i: created_id(t, '/api/product/', data={
+                'title': f'delete-{i}', 'price': '1'})),
+        ('GET /api/product/photo/<filename>', lambda t, i, filename: ('GET', f'/api/product/photo/{filename}', {
+            'headers': auth(t)}), photo_name),
+
+        # client_bp
+        ('POST /api/client/', lambda t, i: ('POST', '/api/client/', {
+            'headers': auth(t), 'json': {'first_name': f'New{i}', 'last_name': 'Client', 'phone': '555'}}), None),
+        ('GET /api/client/', lambda t, i: ('GET', '/api/client/', {'headers': auth(t)}), None),
+        ('POST /api/client/import', lambda t, i: ('POST', '/api/client/import', {
+            'headers': auth(t), 'json': [{'first_name': f'Imported{n}', 'last_name': 'Client'}
+                                         for n in range(50)]}), None),
+        ('GET /api/client/export', lambda t, i: ('GET', '/api/client/export', {'headers': auth(t)}), None),
+        ('GET /api/client/search', lambda t, i: ('GET', '/api/client/search', {
+            'headers': auth(t), 'query_string': {'q': 'Client1'}}), None),
+        ('GET /api/client/<id>', lambda t, i: ('GET', f"/api/client/{rng.choice(t['clients'])}", {
+            'headers': auth(t)}), None),
+        ('PUT /api/client/<id>', lambda t, i: ('PUT', f"/api/client/{rng.choice(t['clients'])}", {
+            'headers': auth(t), 'json': {'phone': str(rng.randrange(10 ** 6, 10 ** 7))}}), None),
+        ('DELETE /api/client/<id>', lambda t, i, client_id: ('DELETE', f'/api/client/{client_id}', {
+            'headers': auth(t)}), lambda t, i: created_id(t, '/api/client/', json={
+                'first_name': f'Delete{i}', 'last_name': 'Client'})),
+
+        # order_bp
+        ('POST /api/order/', lambda t, i: ('POST', '/api/order/', {'headers': auth(t), 'json': new_order(t)}), None),
+        ('GET /api/order/', lambda t, i: ('GET', '/api/order/', {'headers': auth(t)}), None),
+        ('GET /api/order/export', lambda t, i: ('GET', '/api/order/export', {'headers': auth(t)}), None),
+        ('GET /api/order/stats', lambda t, i: ('GET', '/api/order/stats', {'headers': auth(t)}), None),
+        ('GET /api/order/<id>', lambda t, i: ('GET', f"/api/order/{rng.choice(t['orders'])}", {
+            'headers': auth(t)}), None),
+        ('PUT /api/order/<id>', lambda t, i: ('PUT', f"/api/order/{rng.choice(t['orders'])}", {
+            'headers': auth(t), 'json': {'products': new_order(t)['products']}}), None),
+        ('PATCH /api/order/<id>/products', lambda t, i: ('PATCH', f"/api/order/{rng.choice(t['orders'])}/products", {
+            'headers': auth(t), 'json': {'add': [{'product_id': rng.choice(t['products']), 'quantity': 2}]}}), None),
+        ('DELETE /api/order/<id>', lambda t, i, order_id: ('DELETE', f'/api/order/{order_id}', {
+            'headers': auth(t)}), lambda t, i: created_id(t, '/api/order/', json=new_order(t))),
+    ]
+
+
+def run(client, counter, tenants, rng, requests):
+    results = {}
+    for name, build, prepare in scenarios(client, rng):
+        latencies, sql_counts, statuses = [], [], {}
+        for i in range(requests):
+            tenant = tenants[i % len(tenants)]
+            if prepare is None:
+                method, path, kwargs = build(tenant, i)
+            else:
+                method, path, kwargs = build(tenant, i, prepare(tenant, i))
+
+            sql_before = counter.count
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()  # потоковые ответы (экспорт) дочитываются внутри замера
+            elapsed = time.perf_counter() - started
+            response.close()
+
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            # Ошибки отвечают иначе по времени и числу SQL - в замер идут только успешные ответы
+            if 200 <= response.status_code < 300:
+                latencies.append(elapsed)
+                sql_counts.append(counter.count - sql_before)
+
+        results[name] = {
+            'requests': requests,
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'failed': len(latencies) < requests,
+        }
+        if latencies:
+            results[name].update({
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                'rps': round(len(latencies) / sum(latencies), 1),
+                'sql_per_request': round(sum(sql_counts) / len(sql_counts), 2),
+            })
+            timing = (f"p50 {results[name]['p50_ms']:9.2f} ms  p99 {results[name]['p99_ms']:9.2f} ms  "
+                      f"sql {results[name]['sql_per_request']:6.2f}")
+        else:
+            timing = f"{'no successful responses':46}"
+        flag = '  FAILED' if results[name]['failed'] else ''
+        print(f"{name:40} {timing}  {results[name]['statuses']}{flag}", file=sys.stderr)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    # Отдельная папка на прогон: база и загруженные фото (UPLOAD_FOLDER строится от cwd)
+    workdir = tempfile.mkdtemp(prefix='packwa-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    class BenchConfig(config_by_name[args.config]):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        seed_started = time.perf_counter()
+        tenants = seed(args, rng)
+        seed_time = time.perf_counter() - seed_started
+        counter = SqlCounter(db.engine)
+
+    try:
+        results = run(app.test_client(), counter, tenants, rng, args.requests)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': args.config,
+        'dataset': {'users': args.users, 'products': args.products, 'clients': args.clients,
+                    'orders': args.orders, 'lines': args.lines, 'seed': args.seed,
+                    'seed_seconds': round(seed_time, 2)},
+        'endpoints': results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    failed = [name for name, result in results.items() if result['failed']]
+    if failed:
+        print(f"Non-2xx responses: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
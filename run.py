@@ -1,6 +1,9 @@
+import os
+
 from app import create_app
+from app.config import config_by_name
 
-app = create_app()
+app = create_app(config_by_name[os.getenv('APP_CONFIG', 'default')])
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=True)
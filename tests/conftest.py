@@ -0,0 +1,43 @@
+import pytest
+
+from app import create_app
+from app.config import Config
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Фабрика приложения на временной БД; именованные аргументы переопределяют настройки"""
+    # Папка для фото создаётся в текущем каталоге
+    monkeypatch.chdir(tmp_path)
+
+    def make(**overrides):
+        class TestConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "test.db"}'
+            # Быстрый KDF, чтобы регистрация в фикстурах не занимала секунды
+            PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+            JWT_SECRET_KEY = 'test-secret-key-at-least-32-bytes-long'
+
+        for name, value in overrides.items():
+            setattr(TestConfig, name, value)
+        return create_app(TestConfig)
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    client.post('/api/user/register', json={
+        'first_name': 'Ivan', 'last_name': 'Petrov', 'phone': '+79990000000',
+        'email': 'ivan@example.com', 'password': 'secret123',
+    })
+    response = client.post('/api/user/login', json={'email': 'ivan@example.com', 'password': 'secret123'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
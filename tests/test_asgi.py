@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+from app.asgi import AsgiApp  # noqa: E402
+
+
+def _call(asgi, method, path, body=None, headers=None, chunked=False, messages=None):
+    """Один запрос к ASGI-приложению; chunked - JSON-тело частями без content-length.
+
+    messages - готовый список сообщений http.request; после вызова в нём остаются непрочитанные.
+    """
+    raw = json.dumps(body).encode() if body is not None else b''
+    header_list = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    if body is not None:
+        header_list.append((b'content-type', b'application/json'))
+        if not chunked:
+            header_list.append((b'content-length', str(len(raw)).encode()))
+    if messages is None:
+        parts = [raw[i:i + 8] for i in range(0, len(raw), 8)] if chunked else [raw]
+        messages = [{'type': 'http.request', 'body': part, 'more_body': True} for part in parts]
+        messages[-1]['more_body'] = False
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': header_list,
+             'http_version': '1.1', 'scheme': 'http', 'server': ('test', 80), 'client': ('127.0.0.1', 1)}
+    response = {'body': b''}
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] += message.get('body', b'')
+
+    async def run():
+        await asgi(scope, receive, send)
+        await asgi.engine.dispose()
+
+    asyncio.run(run())
+    return response['status'], json.loads(response['body'])
+
+
+@pytest.fixture
+def asgi(app):
+    asgi_app = AsgiApp(app)
+    yield asgi_app
+    asgi_app.executor.shutdown()
+
+
+def test_async_create_order_without_products(asgi, auth_headers):
+    status, body = _call(asgi, 'POST', '/api/order/', {'title': 'Пустой', 'date': '2024-01-01T10:00:00'},
+                         auth_headers)
+
+    assert status == 201
+    assert body['products'] == []
+    assert body['total'] == 0
+
+
+def test_async_create_order_matches_sync(asgi, client, auth_headers):
+    client.post('/api/product/', json={'title': 'Чай', 'price': 10}, headers=auth_headers)
+    status, body = _call(asgi, 'POST', '/api/order/', {
+        'title': 'Заказ', 'date': '2024-01-01T10:00:00', 'products': [{'product_id': 1, 'quantity': 3}],
+    }, auth_headers)
+
+    assert status == 201
+    assert body == client.get(f"/api/order/{body['id']}", headers=auth_headers).get_json()
+
+
+def test_chunked_body_without_content_length(asgi, auth_headers):
+    status, body = _call(asgi, 'POST', '/api/order/', {'title': 'Частями', 'date': '2024-01-01T10:00:00'},
+                         auth_headers, chunked=True)
+
+    assert status == 201
+    assert body['title'] == 'Частями'
+
+
+def test_declared_upload_size_rejected_before_reading(app, asgi, auth_headers):
+    app.config['MAX_FILE_SIZE'] = 1024
+    messages = [{'type': 'http.request', 'body': b'x' * 65536, 'more_body': True} for _ in range(4)]
+    headers = {**auth_headers, 'Content-Type': 'multipart/form-data; boundary=x', 'Content-Length': str(4 * 65536)}
+
+    status, body = _call(asgi, 'POST', '/api/product/', headers=headers, messages=messages)
+
+    assert status == 413
+    assert len(messages) == 4  # тело не читалось
+
+
+def test_chunked_upload_rejected_once_limit_exceeded(app, asgi, auth_headers):
+    app.config['MAX_FILE_SIZE'] = 1024
+    messages = [{'type': 'http.request', 'body': b'x' * 65536, 'more_body': True} for _ in range(4)]
+    headers = {**auth_headers, 'Content-Type': 'multipart/form-data; boundary=x'}
+
+    status, body = _call(asgi, 'POST', '/api/product/', headers=headers, messages=messages)
+
+    assert status == 413
+    assert len(messages) == 2  # чтение остановлено на второй части
@@ -0,0 +1,130 @@
+import os
+
+from app.extensions import db
+from app.product.models import Product
+from app.services.cache_service import MemoryCacheBackend
+from app.services.client_service import ClientService
+
+
+def _create_requests():
+    return [
+        {'method': 'POST', 'path': '/api/product/', 'body': {'title': 'Чай', 'price': 120.5}},
+        {'method': 'POST', 'path': '/api/client/', 'body': {'first_name': 'Anna', 'phone': '+79991112233'}},
+        {'method': 'POST', 'path': '/api/order/', 'body': {
+            'title': 'Заказ', 'date': '2024-01-01T10:00:00', 'client_id': 1,
+            'products': [{'product_id': 1, 'quantity': 2}],
+        }},
+    ]
+
+
+def test_batch_creates_product_client_and_order(client, auth_headers):
+    response = client.post('/api/batch', json={'requests': _create_requests()}, headers=auth_headers)
+
+    assert response.status_code == 200
+    statuses = [result['status'] for result in response.get_json()['results']]
+    assert statuses == [201, 201, 201]
+    order = response.get_json()['results'][2]['body']
+    assert order['total'] == 241.0
+    assert order['products'] == [{'product_id': 1, 'quantity': 2, 'price_at_order': 120.5}]
+
+
+def test_atomic_batch_commits_product_client_and_order(client, auth_headers):
+    response = client.post('/api/batch', json={'atomic': True, 'requests': _create_requests()},
+                           headers=auth_headers)
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['committed'] is True
+    assert len(client.get('/api/product/', headers=auth_headers).get_json()['items']) == 1
+    assert len(client.get('/api/order/', headers=auth_headers).get_json()['items']) == 1
+
+
+def test_atomic_batch_rolls_back_all_creates_on_failure(client, auth_headers):
+    requests = _create_requests()
+    requests[2]['body']['products'] = [{'product_id': 99}]
+    response = client.post('/api/batch', json={'atomic': True, 'requests': requests}, headers=auth_headers)
+
+    body = response.get_json()
+    assert body['committed'] is False
+    assert body['failed_index'] == 2
+    assert client.get('/api/product/', headers=auth_headers).get_json()['items'] == []
+    assert client.get('/api/client/', headers=auth_headers).get_json()['items'] == []
+
+
+def test_batch_reports_earlier_results_when_sub_request_crashes(client, auth_headers, monkeypatch):
+    def crash(*args, **kwargs):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(ClientService, 'create_client', staticmethod(crash))
+
+    response = client.post('/api/batch', json={'requests': _create_requests()[:2]}, headers=auth_headers)
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [201, 500]
+    assert results[1]['body'] == {'error': 'Internal error'}
+    assert len(client.get('/api/product/', headers=auth_headers).get_json()['items']) == 1
+
+
+def test_atomic_batch_reports_crashed_sub_request_as_failed(client, auth_headers, monkeypatch):
+    def crash(*args, **kwargs):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(ClientService, 'create_client', staticmethod(crash))
+
+    response = client.post('/api/batch', json={'atomic': True, 'requests': _create_requests()[:2]},
+                           headers=auth_headers)
+
+    body = response.get_json()
+    assert response.status_code == 409
+    assert body['failed_index'] == 1
+    assert client.get('/api/product/', headers=auth_headers).get_json()['items'] == []
+
+
+def test_service_rollback_in_atomic_batch_keeps_earlier_sub_requests(client, auth_headers, monkeypatch):
+    def rolled_back(user_id, data):
+        # Сервис сам откатил свою ошибку и ответил успехом
+        db.session.rollback()
+        return {'id': None}, None
+    monkeypatch.setattr(ClientService, 'create_client', staticmethod(rolled_back))
+
+    response = client.post('/api/batch', json={'atomic': True, 'requests': _create_requests()[:2]},
+                           headers=auth_headers)
+
+    assert response.get_json()['committed'] is True
+    assert len(client.get('/api/product/', headers=auth_headers).get_json()['items']) == 1
+
+
+def test_rolled_back_atomic_batch_keeps_legacy_photo(app, client, auth_headers):
+    product = client.post('/api/product/', json={'title': 'Чай', 'price': 1}, headers=auth_headers).get_json()
+    path = os.path.join(app.config['UPLOAD_FOLDER'], 'legacy.png')
+    open(path, 'wb').close()
+    with app.app_context():
+        db.session.get(Product, product['id']).photo = 'legacy.png'
+        db.session.commit()
+
+    requests = [
+        {'method': 'DELETE', 'path': f"/api/product/{product['id']}", 'body': None},
+        {'method': 'GET', 'path': '/api/product/999', 'body': None},
+    ]
+    response = client.post('/api/batch', json={'atomic': True, 'requests': requests}, headers=auth_headers)
+
+    assert response.get_json()['committed'] is False
+    assert os.path.exists(path)
+
+    requests = requests[:1]
+    response = client.post('/api/batch', json={'atomic': True, 'requests': requests}, headers=auth_headers)
+
+    assert response.get_json()['committed'] is True
+    assert not os.path.exists(path)
+
+
+def test_rolled_back_atomic_batch_does_not_cache_uncommitted_list(app, client, auth_headers):
+    app.extensions['catalog_cache'] = MemoryCacheBackend(100)
+    requests = [
+        _create_requests()[0],
+        {'method': 'GET', 'path': '/api/product/', 'body': None},
+        {'method': 'DELETE', 'path': '/api/product/999', 'body': None},
+    ]
+    response = client.post('/api/batch', json={'atomic': True, 'requests': requests}, headers=auth_headers)
+
+    assert response.get_json()['committed'] is False
+    assert client.get('/api/product/', headers=auth_headers).get_json()['items'] == []
@@ -0,0 +1,12 @@
+def test_memory_cache_sees_writes_from_another_worker(make_app, auth_headers):
+    reader = make_app(CATALOG_CACHE_BACKEND='memory').test_client()
+    writer = make_app(CATALOG_CACHE_BACKEND='memory').test_client()
+    first = reader.get('/api/product/', headers=auth_headers)
+    assert first.get_json()['items'] == []
+
+    writer.post('/api/product/', json={'title': 'Чай', 'price': 1}, headers=auth_headers)
+
+    response = reader.get('/api/product/', headers={**auth_headers, 'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert [product['title'] for product in response.get_json()['items']] == ['Чай']
+    assert reader.get('/api/product/', headers=auth_headers).get_json()['items'] == response.get_json()['items']
@@ -0,0 +1,45 @@
+import logging
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app import serializers
+from app.extensions import db
+from app.product.schemas import ProductSchema
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(METRICS_ENABLED=True)
+
+
+def _slow(dump):
+    def wrapper(*args, **kwargs):
+        time.sleep(0.05)
+        return dump(*args, **kwargs)
+    return wrapper
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_server_timing_includes_model_serialization(app, client, auth_headers, monkeypatch, fast):
+    app.config['FAST_SERIALIZATION'] = fast
+    client.post('/api/product/', json={'title': 'Чай', 'price': 1}, headers=auth_headers)
+    monkeypatch.setitem(serializers.SERIALIZERS, ProductSchema, _slow(serializers.SERIALIZERS[ProductSchema]))
+    _, products_schema = serializers.SCHEMAS[ProductSchema]
+    monkeypatch.setattr(products_schema, 'dump', _slow(products_schema.dump))
+
+    response = client.get('/api/product/', headers=auth_headers)
+
+    timings = dict(part.strip().split(';', 1) for part in response.headers['Server-Timing'].split(','))
+    assert float(timings['serialize'].split('dur=')[1]) >= 50
+
+
+def test_slow_query_log_works_without_metrics(make_app, caplog):
+    app = make_app(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=0.000001)
+
+    with app.app_context(), caplog.at_level(logging.WARNING, logger='app.metrics'):
+        db.session.execute(text('SELECT 1'))
+
+    assert any('Slow query' in record.getMessage() for record in caplog.records)
+    assert app.test_client().get('/metrics').status_code == 404
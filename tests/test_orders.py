@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture
+def order(client, auth_headers):
+    client.post('/api/product/', json={'title': 'Чай', 'price': 1}, headers=auth_headers)
+    client.post('/api/product/', json={'title': 'Кофе', 'price': 2}, headers=auth_headers)
+    return client.post('/api/order/', json={
+        'title': 'Заказ', 'date': '2024-01-01T10:00:00', 'products': [{'product_id': 1}],
+    }, headers=auth_headers).get_json()
+
+
+def test_patch_rejects_duplicate_product_in_add(client, auth_headers, order):
+    response = client.patch(f"/api/order/{order['id']}/products", json={
+        'add': [{'product_id': 2, 'quantity': 1}, {'product_id': 2, 'quantity': 3}],
+    }, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Product 2 is duplicated in order'}
+    assert client.get(f"/api/order/{order['id']}", headers=auth_headers).get_json()['products'] == order['products']
+
+
+def test_put_rejects_duplicate_product_with_same_error(client, auth_headers, order):
+    response = client.put(f"/api/order/{order['id']}", json={
+        'products': [{'product_id': 2}, {'product_id': 2}],
+    }, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Product 2 is duplicated in order'}
@@ -0,0 +1,30 @@
+from werkzeug.security import generate_password_hash
+
+from app.services.password_service import PasswordService
+from app.user.models import User
+
+
+def test_short_method_name_does_not_require_rehash(app):
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    with app.app_context():
+        assert not PasswordService.needs_rehash(generate_password_hash('secret', method='scrypt'))
+        assert PasswordService.needs_rehash(generate_password_hash('secret', method='scrypt:16384:8:1'))
+
+
+def test_login_keeps_hash_with_current_parameters(app, client, auth_headers):
+    with app.app_context():
+        stored = User.query.one().password
+
+    client.post('/api/user/login', json={'email': 'ivan@example.com', 'password': 'secret123'})
+
+    with app.app_context():
+        assert User.query.one().password == stored
+
+
+def test_login_rehashes_after_method_change(app, client, auth_headers):
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+
+    client.post('/api/user/login', json={'email': 'ivan@example.com', 'password': 'secret123'})
+
+    with app.app_context():
+        assert User.query.one().password.startswith('pbkdf2:sha256:2000$')
@@ -0,0 +1,114 @@
+import io
+import os
+import struct
+import time
+import zlib
+
+from app.extensions import db
+from app.product.models import Photo
+from app.services.photo_service import PhotoService
+
+
+def _png(color):
+    """Минимальный PNG 1x1 заданного цвета"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(b'\x00' + bytes(color))) + chunk(b'IEND', b''))
+
+
+def _create(client, auth_headers, title, image):
+    return client.post('/api/product/', data={'title': title, 'price': '1', 'photo': (io.BytesIO(image), 'p.png')},
+                       headers=auth_headers, content_type='multipart/form-data')
+
+
+def _path(app, filename):
+    return os.path.join(app.config['UPLOAD_FOLDER'], PhotoService.relative_path(filename))
+
+
+def _age(path, seconds):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_failed_create_keeps_blob_for_concurrent_upload(app, client, auth_headers):
+    _create(client, auth_headers, 'Чай', _png((1, 2, 3)))
+    image = _png((4, 5, 6))
+    # Параллельная загрузка того же содержимого уже записала файл, но ещё не закоммитила ссылку
+    with app.app_context():
+        filename = PhotoService.store(io.BytesIO(image), 'png')
+
+    assert _create(client, auth_headers, 'Чай', image).status_code == 400
+    assert os.path.exists(_path(app, filename))
+
+
+def test_deleted_product_blob_is_removed_by_sweep_only(app, client, auth_headers):
+    product = _create(client, auth_headers, 'Чай', _png((1, 2, 3))).get_json()
+    kept = _create(client, auth_headers, 'Кофе', _png((7, 8, 9))).get_json()
+    client.delete(f"/api/product/{product['id']}", headers=auth_headers)
+    orphan, referenced = _path(app, product['photo']), _path(app, kept['photo'])
+    assert os.path.exists(orphan)
+
+    with app.app_context():
+        assert PhotoService.sweep_orphans(3600) == 0  # файл ещё молод
+        _age(orphan, 7200)
+        _age(referenced, 7200)
+        assert PhotoService.sweep_orphans(3600) == 1
+
+    assert not os.path.exists(orphan)
+    assert os.path.exists(referenced)
+
+
+def test_reupload_refreshes_blob_age(app, auth_headers):
+    image = _png((1, 2, 3))
+    with app.app_context():
+        filename = PhotoService.store(io.BytesIO(image), 'png')
+        _age(_path(app, filename), 7200)
+        PhotoService.store(io.BytesIO(image), 'png')
+
+        assert PhotoService.sweep_orphans(3600) == 0
+
+
+def test_original_served_for_failed_variant_is_not_cached_forever(app, client, auth_headers, monkeypatch):
+    product = _create(client, auth_headers, 'Чай', _png((1, 2, 3))).get_json()
+    monkeypatch.setattr(PhotoService, '_build_variant', staticmethod(lambda *args: None))
+
+    response = client.get(f"/api/product/photo/{product['photo']}?size=thumb", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+    assert response.cache_control.max_age is None
+
+
+def test_variant_is_cached_as_immutable(app, client, auth_headers):
+    product = _create(client, auth_headers, 'Чай', _png((1, 2, 3))).get_json()
+
+    response = client.get(f"/api/product/photo/{product['photo']}?size=thumb", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+
+
+def test_deleted_user_photos_are_released_for_sweep(app, client, auth_headers):
+    client.post('/api/user/register', json={
+        'first_name': 'Anna', 'last_name': 'Ivanova', 'phone': '+79990000001',
+        'email': 'anna@example.com', 'password': 'secret123',
+    })
+    token = client.post('/api/user/login', json={'email': 'anna@example.com', 'password': 'secret123'})
+    other_headers = {'Authorization': f"Bearer {token.get_json()['access_token']}"}
+    shared = _create(client, auth_headers, 'Чай', _png((1, 2, 3))).get_json()['photo']
+    _create(client, auth_headers, 'Зелёный чай', _png((1, 2, 3)))
+    own = _create(client, auth_headers, 'Кофе', _png((7, 8, 9))).get_json()['photo']
+    _create(client, other_headers, 'Чай', _png((1, 2, 3)))
+
+    assert client.delete('/api/user/delete', headers=auth_headers).status_code == 200
+
+    with app.app_context():
+        assert db.session.get(Photo, shared).ref_count == 1
+        _age(_path(app, shared), 7200)
+        _age(_path(app, own), 7200)
+        assert PhotoService.sweep_orphans(3600) == 1
+    assert os.path.exists(_path(app, shared))
+    assert not os.path.exists(_path(app, own))
@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.extensions import db
+
+
+@contextmanager
+def count_statements(app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _create_orders(client, auth_headers, count):
+    for i in range(count):
+        client.post('/api/order/', json={
+            'title': f'Заказ {i}', 'date': f'2024-01-{i + 1:02d}T10:00:00',
+            'products': [{'product_id': 1, 'quantity': i + 1}, {'product_id': 2}],
+        }, headers=auth_headers)
+
+
+def _list_statements(app, client, auth_headers):
+    with count_statements(app) as statements:
+        response = client.get('/api/order/', query_string={'limit': 50}, headers=auth_headers)
+    assert response.status_code == 200
+    return len(response.get_json()['items']), len(statements)
+
+
+def test_order_list_issues_constant_number_of_statements(app, client, auth_headers):
+    client.post('/api/product/', json={'title': 'Чай', 'price': 1}, headers=auth_headers)
+    client.post('/api/product/', json={'title': 'Кофе', 'price': 2}, headers=auth_headers)
+
+    _create_orders(client, auth_headers, 2)
+    few_orders, few_statements = _list_statements(app, client, auth_headers)
+    _create_orders(client, auth_headers, 18)
+    many_orders, many_statements = _list_statements(app, client, auth_headers)
+
+    assert (few_orders, many_orders) == (2, 20)
+    assert many_statements == few_statements
+    # версия для ETag, страница заказов, строки заказов (selectinload)
+    assert many_statements <= 3
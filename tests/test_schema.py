@@ -0,0 +1,50 @@
+from sqlalchemy import inspect
+
+from app import commands
+from app.extensions import db
+
+
+class StaleInspector:
+    """Инспектор, снятый до того, как другой процесс досоздал колонки и индексы"""
+
+    def __init__(self, bind):
+        self._inspector = inspect(bind)
+
+    def has_table(self, name):
+        return self._inspector.has_table(name)
+
+    def get_columns(self, name):
+        return [column for column in self._inspector.get_columns(name) if column['name'] != 'updated_at']
+
+    def get_indexes(self, name):
+        return []
+
+
+def test_upgrade_schema_tolerates_concurrent_upgrade(app, monkeypatch):
+    monkeypatch.setattr(commands, 'inspect', StaleInspector)
+    with app.app_context():
+        added, created = commands.upgrade_schema()
+        assert added == []
+        assert created
+
+        # Схема не изменилась: колонки и индексы на месте
+        assert 'updated_at' in {column['name'] for column in inspect(db.engine).get_columns('products')}
+
+
+def test_create_tables_tolerates_concurrent_create(app, monkeypatch):
+    with app.app_context():
+        dialect_class = type(db.engine.dialect)
+        has_table = dialect_class.has_table
+        checked = set()
+
+        def stale_has_table(self, connection, table_name, *args, **kwargs):
+            # Первая проверка каждой таблицы - до того, как её создал другой процесс
+            if table_name not in checked:
+                checked.add(table_name)
+                return False
+            return has_table(self, connection, table_name, *args, **kwargs)
+        monkeypatch.setattr(dialect_class, 'has_table', stale_has_table)
+
+        commands.create_tables()
+
+        assert 'products' in checked
@@ -0,0 +1,20 @@
+from sqlalchemy import text
+
+from app.extensions import db
+
+
+def test_search_index_created_on_existing_database_is_populated(make_app, app, client, auth_headers):
+    client.post('/api/product/', json={'title': 'Зелёный чай', 'price': 1}, headers=auth_headers)
+    client.post('/api/client/', json={'first_name': 'Anna', 'phone': '+79991112233'}, headers=auth_headers)
+    # БД до появления поиска: таблиц FTS ещё нет
+    with app.app_context():
+        db.session.execute(text('DROP TABLE products_fts'))
+        db.session.execute(text('DROP TABLE clients_fts'))
+        db.session.commit()
+
+    client = make_app().test_client()
+
+    products = client.get('/api/product/search?q=чай', headers=auth_headers).get_json()['items']
+    clients = client.get('/api/client/search?q=anna', headers=auth_headers).get_json()['items']
+    assert [product['title'] for product in products] == ['Зелёный чай']
+    assert [found['first_name'] for found in clients] == ['Anna']
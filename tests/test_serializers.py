@@ -0,0 +1,89 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import selectinload
+
+from app.client.models import Client
+from app.client.schemas import ClientSchema
+from app.extensions import db
+from app.order.models import Order, OrderProduct
+from app.order.schemas import OrderSchema
+from app.product.models import Product
+from app.product.schemas import ProductSchema
+from app.serializers import SCHEMAS, SERIALIZERS, dump
+from app.user.models import User
+
+
+def _as_json(data):
+    # Сравниваем JSON, а не словари: 1 == 1.0, но в ответе это разные значения
+    return json.dumps(data, sort_keys=True, ensure_ascii=False)
+
+
+@pytest.fixture
+def rows(app):
+    with app.app_context():
+        user = User(first_name='Иван', last_name='Петров', phone='+79990000000', email='ivan@example.com',
+                    password='x')
+        db.session.add(user)
+        db.session.flush()
+        products = [
+            Product(user_id=user.id, title='Чай «Зелёный»', description='Описание — с эмодзи ☕', price=0.1,
+                    photo='ab/cd/abcd.png'),
+            Product(user_id=user.id, title='Без описания', description=None, price=Decimal('19.99'), photo=None),
+            Product(user_id=user.id, title='Целая цена', description='', price=5),
+            Product(user_id=user.id, title='Большая цена', price=123456789.123),
+            Product(user_id=user.id, title='Малая цена', price=1e-7),
+        ]
+        clients = [
+            Client(user_id=user.id, first_name='Анна', last_name=None, phone=None),
+            Client(user_id=user.id, first_name='Ёжик', last_name='Туманов', phone='+7 (999) 000-00-00'),
+        ]
+        db.session.add_all(products + clients)
+        db.session.flush()
+        orders = [
+            Order(user_id=user.id, title='Заказ №1', address='ул. Ленина, 1', date=datetime(2024, 1, 1, 10, 0),
+                  client_id=clients[0].id, total=0.30000000000000004, item_count=3,
+                  products=[OrderProduct(product_id=products[0].id, quantity=3, price_at_order=0.1)]),
+            Order(user_id=user.id, title='Пустой', address=None, date=datetime(2024, 2, 29, 23, 59, 59, 123456),
+                  client_id=None, products=[]),
+            Order(user_id=user.id, title='Два товара', date=datetime(2024, 3, 1), total=Decimal('39.98'),
+                  item_count=2, products=[
+                      OrderProduct(product_id=products[1].id, quantity=1, price_at_order=Decimal('19.99')),
+                      OrderProduct(product_id=products[2].id, quantity=1, price_at_order=19.99),
+                  ]),
+        ]
+        db.session.add_all(orders)
+        db.session.commit()
+    return app
+
+
+@pytest.mark.parametrize('model, schema_class, options', [
+    (Product, ProductSchema, ()),
+    (Client, ClientSchema, ()),
+    (Order, OrderSchema, (selectinload(Order.products),)),
+])
+def test_fast_serializer_matches_marshmallow(rows, model, schema_class, options):
+    with rows.app_context():
+        objects = model.query.options(*options).order_by(model.id).all()
+        schema, many_schema = SCHEMAS[schema_class]
+        serialize = SERIALIZERS[schema_class]
+
+        assert objects
+        for obj in objects:
+            assert _as_json(serialize(obj)) == _as_json(schema.dump(obj))
+        assert _as_json([serialize(obj) for obj in objects]) == _as_json(many_schema.dump(objects))
+
+
+@pytest.mark.parametrize('schema_class, model', [(ProductSchema, Product), (ClientSchema, Client),
+                                                 (OrderSchema, Order)])
+def test_dump_is_the_same_with_and_without_fast_path(rows, schema_class, model):
+    with rows.app_context():
+        objects = model.query.order_by(model.id).all()
+        rows.config['FAST_SERIALIZATION'] = True
+        fast = rows.json.dumps(dump(schema_class, objects, many=True))
+        rows.config['FAST_SERIALIZATION'] = False
+        slow = rows.json.dumps(dump(schema_class, objects, many=True))
+
+    assert fast == slow
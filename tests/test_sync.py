@@ -0,0 +1,31 @@
+from app.extensions import db
+from app.sync.models import Tombstone
+
+
+def _sync(client, auth_headers, since=None):
+    query = {'since': since} if since else {}
+    return client.get('/api/sync', query_string=query, headers=auth_headers).get_json()
+
+
+def test_deleted_id_is_not_reused(client, auth_headers):
+    client.post('/api/product/', json={'title': 'Чай', 'price': 1}, headers=auth_headers)
+    client.delete('/api/product/1', headers=auth_headers)
+
+    created = client.post('/api/product/', json={'title': 'Кофе', 'price': 2}, headers=auth_headers).get_json()
+
+    assert created['id'] == 2
+
+
+def test_row_and_tombstone_with_same_id_are_not_both_returned(app, client, auth_headers):
+    since = _sync(client, auth_headers)['next']
+    client.post('/api/product/', json={'title': 'Чай', 'price': 1}, headers=auth_headers)
+    # БД без AUTOINCREMENT: удалённый id 1 выдан новой строке
+    with app.app_context():
+        db.session.add(Tombstone(user_id=1, resource='product', resource_id=1))
+        db.session.add(Tombstone(user_id=1, resource='product', resource_id=7))
+        db.session.commit()
+
+    changes = _sync(client, auth_headers, since)
+
+    assert [row['id'] for row in changes['products']] == [1]
+    assert changes['deleted']['product'] == [7]